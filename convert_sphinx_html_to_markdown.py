@@ -1,17 +1,162 @@
 import os
 import argparse
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait,
+)
 from pathlib import Path
-from markdownify import markdownify as md
-from bs4 import BeautifulSoup
+from markdownify import MarkdownConverter, ATX
+from lxml import etree
+import lxml.html
 
-def convert_html_to_markdown(source_dir="_build/html", output_dir="_build/markdown"):
+# Sphinx-generated pages and directories without documentation content
+SKIP_NAMES = {'genindex.html', 'search.html', 'py-modindex.html',
+              'searchindex.html'}
+SKIP_DIRS = {'_static', '_sources', '_images'}
+
+# Shared converter, built once per process. ATX headings (`#`) are what the
+# chunker splits on; script and style contents are already dropped.
+_CONVERTER = MarkdownConverter(heading_style=ATX, bullets='-',
+                               bs4_options='lxml')
+
+
+def _is_main_document_div(element):
+    """Check whether an element is the Sphinx main document div."""
+    classes = (element.get('class') or '').split()
+    return 'document' in classes and element.get('role') == 'main'
+
+
+def extract_main_content(html_file_path):
+    """
+    Stream an HTML file and return the serialized main document div.
+    
+    Only the subtree of the main div is kept in memory; elements outside it
+    are released as soon as they have been parsed.
+    
+    Args:
+        html_file_path: Path to the HTML file
+        
+    Returns:
+        str or None: HTML of the main document div, or None if not found
+    """
+    inside_main = False
+    context = etree.iterparse(str(html_file_path), events=('start', 'end'),
+                              tag='div', html=True, encoding='utf-8')
+    for event, element in context:
+        if event == 'start':
+            if _is_main_document_div(element):
+                inside_main = True
+            continue
+        
+        if _is_main_document_div(element):
+            return lxml.html.tostring(element, encoding='unicode',
+                                      with_tail=False)
+        
+        if not inside_main:
+            # Release parsed elements we no longer need
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    
+    return None
+
+
+def _is_boilerplate(relative_path):
+    """Check whether a page is Sphinx boilerplate (index, search, assets)."""
+    return (relative_path.name in SKIP_NAMES or
+            relative_path.parts[0] in SKIP_DIRS)
+
+
+def _iter_html_files(source_path, output_path):
+    """
+    Lazily yield the HTML files under source_path, skipping boilerplate pages.
+    
+    Output directories are created here, once per directory, so the workers
+    don't each have to call mkdir.
+    
+    Args:
+        source_path (Path): Root directory of the HTML files
+        output_path (Path): Root directory for the markdown files
+        
+    Yields:
+        Path: HTML file path
+    """
+    created_dirs = set()
+    for html_file_path in source_path.rglob('*.html'):
+        if _is_boilerplate(html_file_path.relative_to(source_path)):
+            continue
+        
+        md_dir = output_path / html_file_path.parent.relative_to(source_path)
+        if md_dir not in created_dirs:
+            md_dir.mkdir(parents=True, exist_ok=True)
+            created_dirs.add(md_dir)
+        yield html_file_path
+
+
+def _convert_one(html_file_path, source_path, output_path):
+    """
+    Convert a single HTML file to markdown.
+    
+    Runs in a worker process, so it reports back instead of printing.
+    
+    Args:
+        html_file_path (Path): HTML file to convert
+        source_path (Path): Root directory of the HTML files
+        output_path (Path): Root directory for the markdown files
+        
+    Returns:
+        tuple: (html_file_path, md_file_path, status) where status is
+            'converted', 'skipped' or an error message
+    """
+    # Calculate relative path to maintain directory structure
+    relative_path = html_file_path.relative_to(source_path)
+    
+    # Create corresponding markdown file path
+    md_file_path = output_path / relative_path.with_suffix('.md')
+    
+    try:
+        # Extract main document content (Sphinx-specific)
+        main_content = extract_main_content(html_file_path)
+        
+        if not main_content:
+            # Pages without main content are navigation or boilerplate
+            return html_file_path, md_file_path, 'skipped'
+        
+        # Convert only the main content to markdown
+        markdown_content = _CONVERTER.convert(main_content)
+        
+        # Write markdown file
+        with open(md_file_path, 'w', encoding='utf-8') as f:
+            f.write(markdown_content)
+        
+        return html_file_path, md_file_path, 'converted'
+    
+    except Exception as e:
+        return html_file_path, md_file_path, str(e)
+
+
+def _report(result):
+    """Print the outcome of one _convert_one call."""
+    html_file_path, md_file_path, status = result
+    if status == 'converted':
+        print(f"Converted: {html_file_path} -> {md_file_path}")
+    elif status == 'skipped':
+        print(f"Warning: No main document content found in {html_file_path}, skipping")
+    else:
+        print(f"Error converting {html_file_path}: {status}")
+
+
+def convert_html_to_markdown(source_dir="_build/html", output_dir="_build/markdown",
+                             max_workers=None):
     """
     Convert Sphinx-generated HTML files under source_dir to markdown files in output_dir.
     Only converts the main document content, excluding navigation and sidebars.
+    Sphinx boilerplate pages and pages without main content are skipped.
+    Files are converted in parallel worker processes.
     
     Args:
         source_dir (str): Directory containing HTML files to convert
         output_dir (str): Directory where markdown files will be saved
+        max_workers (int): Number of worker processes (default: CPU count)
     """
     source_path = Path(source_dir)
     output_path = Path(output_dir)
@@ -19,52 +164,21 @@ def convert_html_to_markdown(source_dir="_build/html", output_dir="_build/markdo
     # Create output directory if it doesn't exist
     output_path.mkdir(parents=True, exist_ok=True)
     
-    # Walk through all files in the source directory
-    for root, dirs, files in os.walk(source_path):
-        for file in files:
-            if file.endswith('.html'):
-                # Get the full path of the HTML file
-                html_file_path = Path(root) / file
-                
-                # Calculate relative path to maintain directory structure
-                relative_path = html_file_path.relative_to(source_path)
-                
-                # Create corresponding markdown file path
-                md_file_path = output_path / relative_path.with_suffix('.md')
-                
-                # Create subdirectories if needed
-                md_file_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                try:
-                    # Read HTML file
-                    with open(html_file_path, 'r', encoding='utf-8') as f:
-                        html_content = f.read()
-                    
-                    # Parse HTML and extract main document content
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    
-                    # Find the main document div (Sphinx-specific)
-                    main_content = soup.find('div', {'class': 'document', 'role': 'main'})
-                    
-                    if main_content:
-                        # Convert only the main content to markdown
-                        markdown_content = md(str(main_content))
-                        
-                        # Write markdown file
-                        with open(md_file_path, 'w', encoding='utf-8') as f:
-                            f.write(markdown_content)
-                        
-                        print(f"Converted: {html_file_path} -> {md_file_path}")
-                    else:
-                        print(f"Warning: No main document content found in {html_file_path}")
-                        # Fallback to converting entire HTML if main content not found
-                        markdown_content = md(html_content)
-                        with open(md_file_path, 'w', encoding='utf-8') as f:
-                            f.write(markdown_content)
-                        print(f"Converted (fallback): {html_file_path} -> {md_file_path}")
-                    
-                except Exception as e:
-                    print(f"Error converting {html_file_path}: {str(e)}")
+    max_workers = max_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # Submit in a bounded window, so only a few files per worker are in
+        # flight while the directory walk continues
+        pending = set()
+        for html_file_path in _iter_html_files(source_path, output_path):
+            if len(pending) >= 4 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _report(future.result())
+            pending.add(executor.submit(_convert_one, html_file_path,
+                                        source_path, output_path))
+        
+        for future in as_completed(pending):
+            _report(future.result())
     
     print(f"Conversion complete! Markdown files saved in: {output_path}")
 
@@ -85,6 +199,13 @@ if __name__ == "__main__":
         default="_build/markdown",
         help="Directory where markdown files will be saved (default: _build/markdown)"
     )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count)"
+    )
     
     args = parser.parse_args()
     
@@ -92,5 +213,5 @@ if __name__ == "__main__":
     print(f"Output directory: {args.output}")
     print("-" * 50)
     
-    convert_html_to_markdown(args.source, args.output)
+    convert_html_to_markdown(args.source, args.output, args.workers)
 
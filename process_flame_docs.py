@@ -5,18 +5,27 @@ Converts markdown files to chunks, creates embeddings, and stores in Qdrant.
 """
 
 import os
-import json
+import asyncio
+import itertools
 import logging
-import hashlib
+import mmap
 import re
+import sqlite3
+import uuid
 import time
 import random
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 
+import orjson
 import tiktoken
+from blake3 import blake3
 from tqdm import tqdm
 from openai import AzureOpenAI
 from qdrant_client import QdrantClient, models
@@ -39,27 +48,95 @@ logging.getLogger("openai").setLevel(logging.WARNING)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
 
+# Fenced code blocks, inline code and indented code (simplified)
+_CODE_RE = re.compile(r'(```[\s\S]*?```)|(`[^`\n]+`)|(^ {4,}.*$)', re.MULTILINE)
 
-@dataclass
+# Markdown ATX headings: level markers and heading text
+_HEADING_RE = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t]*$', re.MULTILINE)
+
+# Files smaller than this (in bytes) have no content worth embedding
+_MIN_FILE_SIZE = 16
+
+# Files at least this large (in bytes) are memory-mapped instead of read
+_MMAP_MIN_SIZE = 32 * 1024
+
+# Azure OpenAI accepts at most this many inputs per embedding request
+_MAX_EMBEDDING_INPUTS = 2048
+
+# Collection vectors: original vectors live on disk, quantized copies in RAM
+_VECTOR_PARAMS = VectorParams(size=1536, distance=Distance.COSINE, on_disk=True)
+# 1 bit per dimension; searches rescore with the original vectors
+_QUANTIZATION_CONFIG = models.BinaryQuantization(
+    binary=models.BinaryQuantizationConfig(always_ram=True))
+
+
+@contextmanager
+def _open_markdown(file_path: Path, size: int):
+    """Yield the raw bytes of a file, memory-mapped when it is large."""
+    if size < _MMAP_MIN_SIZE:
+        yield file_path.read_bytes()
+        return
+
+    with open(file_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield data
+
+
+class TokenBucket:
+    """Thread-safe token bucket that paces requests to a steady rate.
+
+    Requests pass immediately while tokens are available, so short bursts up
+    to `capacity` are free and sustained load is held to `rate` per second.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1):
+        """Take tokens from the bucket, sleeping until enough have refilled."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the tokens now, concurrent callers queue up behind us
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+@dataclass(slots=True)
 class DocumentChunk:
     """Represents a chunk of document content with metadata."""
     content: str
     metadata: Dict[str, Any]
     chunk_id: str
+    # Upper bound on the tokens in content, used to size embedding requests
+    token_count: int = 0
 
 
 class FlameDocsProcessor:
     """Main processor for Flame documentation."""
 
-    def __init__(self, version: str = "1.7.0"):
+    def __init__(self, version: str = "1.7.0",
+                 openai_client: Optional[AzureOpenAI] = None,
+                 qdrant_client: Optional[QdrantClient] = None):
+        """Create a processor, building any client that is not passed in."""
         self.version = version
         self.source_dir = Path("_build/markdown")
-        self.state_file = Path("processing_state.json")
+        self.state_file = Path("processing_state.db")
         self.error_file = Path("processing_errors.json")
 
         # Initialize tokenizer for chunk sizing
         self.tokenizer = tiktoken.get_encoding(
             "cl100k_base")  # BG Note: we may need to change
+        self._paragraph_separator = self.tokenizer.encode_ordinary('\n\n')
 
         # Chunking parameters
         # BG Note: have a way to easily config this
@@ -70,34 +147,75 @@ class FlameDocsProcessor:
         # Rate limiting parameters
         self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
         self.base_delay = float(os.getenv("OPENAI_BASE_DELAY", "1.0"))
-        self.batch_delay = float(os.getenv("OPENAI_BATCH_DELAY", "0.1"))
+        # Pace embedding requests to the deployment's requests-per-minute
+        # quota, bursts of up to 60 requests pass without waiting
+        self.rate_limiter = TokenBucket(
+            rate=float(os.getenv("OPENAI_RPM", "3500")) / 60.0, capacity=60)
+
+        # Number of embedding (and upsert) requests in flight at once
+        self.concurrency = int(os.getenv("OPENAI_CONCURRENCY", "16"))
+        # Maximum number of chunks sent in one embedding request
+        self.embedding_batch_size = min(
+            int(os.getenv("OPENAI_EMBEDDING_BATCH_SIZE", "256")),
+            _MAX_EMBEDDING_INPUTS)
+        # Maximum number of tokens sent in one embedding request
+        self.embedding_batch_tokens = int(
+            os.getenv("OPENAI_EMBEDDING_BATCH_TOKENS", "250000"))
 
         # Initialize clients
-        self._init_openai_client()
-        self._init_qdrant_client()
+        self._init_openai_client(openai_client)
+        self._init_qdrant_client(qdrant_client)
 
-        # Processing state
+        # Processing state (shared with worker threads)
+        self._state_lock = threading.Lock()
+        self._state_db: Optional[sqlite3.Connection] = None
+        self._state_db_path: Optional[Path] = None
         self.processed_files = set()
+        # Content hash of each processed file, used to detect changes
+        self.file_hashes: Dict[str, str] = {}
+        # Relative paths of changed files whose old points are still stored
+        self._stale_files = set()
+        # Set when the state changed since it was last saved or loaded,
+        # _save_state writes nothing while it is clear
+        self._state_dirty = True
         self.errors = []
         self.chunks_created = 0
+        # HNSW indexing is paused on the first upload of a run, and the
+        # collection's threshold is restored when the run ends
+        self._indexing_lock = threading.Lock()
+        self._pause_indexing_on_store = False
+        self._paused_indexing_threshold: Optional[int] = None
 
         self._load_state()
 
-    def _init_openai_client(self):
-        """Initialize Azure OpenAI client."""
-        self.openai_client = AzureOpenAI(
+    def _init_openai_client(self, client: Optional[AzureOpenAI] = None):
+        """Initialize Azure OpenAI client, unless one is given."""
+        self.openai_client = client or AzureOpenAI(
             api_key=os.getenv("OPENAI_API_KEY"),
             api_version=os.getenv("OPENAI_API_VERSION", "2024-02-01"),
             azure_endpoint=os.getenv("OPENAI_API_BASE"),
         )
 
-    def _init_qdrant_client(self):
-        """Initialize Qdrant client and ensure collection exists."""
-        self.qdrant_client = QdrantClient(
+    def _init_qdrant_client(self, client: Optional[QdrantClient] = None):
+        """Initialize Qdrant client, unless one is given, and ensure collection exists."""
+        # Upserts go over gRPC (packed floats, no JSON encoding) by default
+        self.qdrant_client = client or QdrantClient(
             url=os.getenv("QDRANT_HOST"),
             port=os.getenv("QDRANT_PORT"),
+            grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+            prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true",
+            timeout=120,
         )
         self.collection_name = os.getenv("COLLECTION_NAME", "flame_docs")
+        # HNSW graph parameters used when creating the collection
+        self.hnsw_m = int(os.getenv("QDRANT_HNSW_M", "24"))
+        self.hnsw_ef_construct = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "128"))
+        # Indexing threshold restored after bulk ingestion when the
+        # collection does not report its own
+        self.indexing_threshold = 20000
+        # Maximum number of points sent in one upsert request
+        self.upsert_batch_size = int(
+            os.getenv("QDRANT_UPSERT_BATCH_SIZE", "128"))
         self._ensure_collection_exists()
 
     def _ensure_collection_exists(self):
@@ -109,65 +227,225 @@ class FlameDocsProcessor:
             logger.info(f"Creating collection '{self.collection_name}'")
             self.qdrant_client.create_collection(
                 collection_name=self.collection_name,
-                vectors_config=VectorParams(size=1536,
-                                            distance=Distance.COSINE),
+                vectors_config=_VECTOR_PARAMS,
                 hnsw_config=models.HnswConfigDiff(
-                    m=16, 
-                    ef_construct=200,
+                    m=self.hnsw_m,
+                    ef_construct=self.hnsw_ef_construct,
                     full_scan_threshold=10000
-                ))
+                ),
+                quantization_config=_QUANTIZATION_CONFIG)
+
+    def _pause_indexing(self):
+        """Pause HNSW indexing before the first upload of a run."""
+        with self._indexing_lock:
+            if not self._pause_indexing_on_store:
+                return
+            self._pause_indexing_on_store = False
+            try:
+                info = self.qdrant_client.get_collection(self.collection_name)
+                threshold = info.config.optimizer_config.indexing_threshold
+            except Exception as e:
+                logger.warning(f"Could not read indexing threshold, indexing stays on: {e}")
+                return
+            if not isinstance(threshold, int):
+                threshold = self.indexing_threshold
+            self._set_indexing_threshold(0)
+            self._paused_indexing_threshold = threshold
+
+    def _resume_indexing(self):
+        """Restore the indexing threshold the collection had before the run."""
+        with self._indexing_lock:
+            self._pause_indexing_on_store = False
+            if self._paused_indexing_threshold is not None:
+                self._set_indexing_threshold(self._paused_indexing_threshold)
+                self._paused_indexing_threshold = None
+
+    def _set_indexing_threshold(self, threshold: int):
+        """Update the HNSW indexing threshold of the collection."""
+        try:
+            self.qdrant_client.update_collection(
+                collection_name=self.collection_name,
+                optimizers_config=models.OptimizersConfigDiff(
+                    indexing_threshold=threshold))
+        except Exception as e:
+            logger.warning(f"Could not set indexing threshold to {threshold}: {e}")
+
+    def _connect_state_db(self) -> sqlite3.Connection:
+        """Open (or reuse) the SQLite state database at state_file."""
+        if self._state_db is not None and self._state_db_path == self.state_file:
+            return self._state_db
+
+        self._close_state_db()
+        # Autocommit connection, shared by the worker threads under _state_lock
+        conn = sqlite3.connect(str(self.state_file),
+                               isolation_level=None,
+                               check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS processed("
+                         "path TEXT PRIMARY KEY, content_hash TEXT, "
+                         "chunks INT, ts TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta("
+                         "key TEXT PRIMARY KEY, value TEXT)")
+        except sqlite3.Error:
+            conn.close()
+            raise
+
+        self._state_db = conn
+        self._state_db_path = self.state_file
+        return conn
+
+    def _close_state_db(self):
+        """Close the state database connection, if open."""
+        if self._state_db is not None:
+            try:
+                # Fold the write-ahead log back into the database file
+                self._state_db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as e:
+                logger.warning(f"Could not checkpoint state database: {e}")
+            self._state_db.close()
+            self._state_db = None
+            self._state_db_path = None
 
     def _load_state(self):
-        """Load processing state from file."""
+        """Load processing state from the state database."""
         if self.state_file.exists():
             try:
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
-                    self.processed_files = set(state.get(
-                        'processed_files', []))
-                    self.chunks_created = state.get('chunks_created', 0)
+                with self._state_lock:
+                    conn = self._connect_state_db()
+                    rows = conn.execute(
+                        "SELECT path, content_hash FROM processed").fetchall()
+                    meta = dict(conn.execute("SELECT key, value FROM meta"))
+                self.processed_files = {path for path, _ in rows}
+                self.file_hashes = {
+                    path: content_hash
+                    for path, content_hash in rows if content_hash
+                }
+                self.chunks_created = int(meta.get('chunks_created', 0))
+                self._state_dirty = False
                 logger.info(
                     f"Loaded state: {len(self.processed_files)} files processed"
                 )
             except Exception as e:
                 logger.warning(f"Could not load state file: {e}")
+        elif self.state_file.with_suffix(".json").exists():
+            self._migrate_json_state(self.state_file.with_suffix(".json"))
+
+    def _migrate_json_state(self, legacy_file: Path):
+        """Import the processed files of a JSON state file from older releases.
+
+        The imported files have no content hash, so they are trusted as-is and
+        keep the points stored under the previous ID scheme.
+        """
+        try:
+            state = orjson.loads(legacy_file.read_bytes())
+            self.processed_files = set(state.get('processed_files', []))
+            self.chunks_created = state.get('chunks_created', 0)
+            self._state_dirty = True
+            self._save_state()
+            # Renamed so a later --reset does not import it again
+            legacy_file.rename(legacy_file.with_suffix(".json.migrated"))
+            logger.info(
+                f"Migrated {len(self.processed_files)} files from {legacy_file}"
+            )
+        except Exception as e:
+            logger.warning(f"Could not migrate state file {legacy_file}: {e}")
+
+    def _record_processed(self, file_path: Path, content_hash: str,
+                          chunks: int):
+        """Persist a single processed file. Caller must hold _state_lock."""
+        conn = self._connect_state_db()
+        # One transaction, so each file costs a single commit
+        conn.execute("BEGIN")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?)",
+                (str(file_path), content_hash, chunks,
+                 datetime.now().isoformat()))
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('chunks_created', ?)",
+                (str(self.chunks_created),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
 
     def _save_state(self):
-        """Save current processing state."""
-        state = {
-            'processed_files': list(self.processed_files),
-            'chunks_created': self.chunks_created,
-            'last_updated': datetime.now().isoformat()
-        }
-        with open(self.state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        """Save current processing state.
+
+        Files are persisted one at a time as they complete, so this only
+        needs to write the counters and any files not recorded yet. Nothing
+        is written when no file was processed or deleted since the last save.
+        """
+        with self._state_lock:
+            if not self._state_dirty:
+                return
+
+            conn = self._connect_state_db()
+            now = datetime.now().isoformat()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO processed(path, content_hash, ts) "
+                    "VALUES (?, ?, ?)",
+                    ((path, self.file_hashes.get(path), now)
+                     for path in self.processed_files))
+                conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                 [('chunks_created', str(self.chunks_created)),
+                                  ('last_updated', now)])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._state_dirty = False
+
+    def _reset_state(self):
+        """Delete the state database and forget all processed files."""
+        with self._state_lock:
+            self._close_state_db()
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{self.state_file}{suffix}").unlink(missing_ok=True)
+            self.processed_files = set()
+            self.file_hashes = {}
+            self.chunks_created = 0
+            self._state_dirty = True
 
     def _save_errors(self):
-        """Save error report."""
+        """Save error report.
+
+        Written to a temporary file and renamed over the report, so a crash
+        never leaves a partially written report behind.
+        """
         if self.errors:
-            with open(self.error_file, 'w') as f:
-                json.dump(self.errors, f, indent=2)
+            tmp_file = self.error_file.with_name(self.error_file.name + ".tmp")
+            try:
+                tmp_file.write_bytes(
+                    orjson.dumps(self.errors, option=orjson.OPT_INDENT_2))
+                os.replace(tmp_file, self.error_file)
+            except Exception:
+                tmp_file.unlink(missing_ok=True)
+                raise
 
     def _count_tokens(self, text: str) -> int:
         """Count tokens in text."""
-        return len(self.tokenizer.encode(text))
+        return len(self.tokenizer.encode_ordinary(text))
 
     def _extract_metadata_from_path(self, file_path: Path) -> Dict[str, Any]:
         """Extract metadata from file path."""
-        relative_path = str(file_path.relative_to(self.source_dir))
-        relative_parts = Path(relative_path).parts
+        relative_path = file_path.relative_to(self.source_dir).as_posix()
 
         # Determine section from relative path
-        section = relative_parts[0] if len(relative_parts) > 0 else "unknown"
+        section = relative_path.partition('/')[0] or "unknown"
 
         # Determine content type from path patterns
+        lowered_path = relative_path.lower()
         content_type = "reference"
-        if "tutorial" in relative_path.lower():
+        if "tutorial" in lowered_path:
             content_type = "tutorial"
-        elif "example" in relative_path.lower():
+        elif "example" in lowered_path:
             content_type = "example"
-        elif any(api_term in relative_path.lower()
-                 for api_term in ["api", "reference"]):
+        elif "api" in lowered_path or "reference" in lowered_path:
             content_type = "api"
 
         return {
@@ -177,194 +455,261 @@ class FlameDocsProcessor:
             "content_type": content_type
         }
 
-    def _extract_heading_hierarchy(self, content: str) -> List[str]:
+    def _extract_heading_hierarchy(
+            self, content: str,
+            headings: Optional[List[re.Match]] = None) -> List[str]:
         """Extract heading hierarchy from markdown content."""
-        headings = []
-        for line in content.split('\n'):
-            line = line.strip()
-            if line.startswith('#'):
-                # Extract heading text, removing leading #'s and whitespace
-                heading_text = line.lstrip('#').strip()
-                if heading_text:
-                    headings.append(heading_text)
-        return headings
+        if headings is None:
+            headings = _HEADING_RE.finditer(content)
+        return [match.group(2) for match in headings]
 
     def _detect_code_blocks(self, content: str) -> bool:
         """Detect if chunk contains significant code blocks."""
-        code_patterns = [
-            r'```[\s\S]*?```',  # Fenced code blocks
-            r'`[^`\n]+`',  # Inline code
-            r'^\s{4,}.*$'  # Indented code (simplified)
-        ]
-
-        code_content = ""
-        for pattern in code_patterns:
-            matches = re.findall(pattern, content, re.MULTILINE)
-            code_content += " ".join(matches)
-
         # Consider it has significant code if >20% is code or >100 chars of code
-        code_ratio = len(code_content) / len(content) if content else 0
-        return code_ratio > 0.2 or len(code_content) > 100
-
-    def _split_by_headers(self, content: str) -> List[str]:
-        """Split content by markdown headers while preserving structure."""
-        sections = []
-        current_section = []
-
-        for line in content.split('\n'):
-            if line.startswith('#') and current_section:
-                # Save previous section
-                sections.append('\n'.join(current_section))
-                current_section = [line]
-            else:
-                current_section.append(line)
-
-        # Add final section
-        if current_section:
-            sections.append('\n'.join(current_section))
-
-        return sections
+        # Code spans need a pair of backticks, and indented code needs an
+        # indented line, chunks with neither skip the regex
+        if (content.count('`') < 2 and '\n    ' not in content
+                and not content.startswith('    ')):
+            return False
 
-    def _split_large_section(self, section: str, max_tokens: int) -> List[str]:
-        """Split large sections by sentences/paragraphs with overlap."""
-        if self._count_tokens(section) <= max_tokens:
-            return [section]
+        threshold = min(len(content) * 0.2, 100)
+        code_length = 0
+        for match in _CODE_RE.finditer(content):
+            code_length += match.end() - match.start()
+            if code_length > threshold:
+                return True
+        return False
 
-        # Split by paragraphs first
-        paragraphs = section.split('\n\n')
-        chunks = []
-        current_chunk = ""
+    def _split_by_headers(
+            self, content: str,
+            headings: Optional[List[re.Match]] = None) -> List[str]:
+        """Split content by markdown headers while preserving structure."""
+        if headings is None:
+            headings = _HEADING_RE.finditer(content)
+        starts = [match.start() for match in headings]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        # Each section ends before the newline preceding the next header
+        starts.append(len(content) + 1)
+
+        return [
+            content[starts[i]:starts[i + 1] - 1]
+            for i in range(len(starts) - 1)
+        ]
 
-        for para in paragraphs:
-            test_chunk = current_chunk + "\n\n" + para if current_chunk else para
+    def _section_heading_paths(
+            self, headings: List[re.Match]) -> List[List[str]]:
+        """Heading path of each section returned by _split_by_headers.
+
+        Built with a stack of open headings during the same scan, so each
+        section gets its own breadcrumb, e.g. ["Flame", "Components",
+        "SpriteComponent"].
+        """
+        # Content before the first heading has no heading path
+        paths = [] if headings and headings[0].start() == 0 else [[]]
+        stack: List[Tuple[int, str]] = []
+        for match in headings:
+            level = len(match.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, match.group(2)))
+            paths.append([heading for _, heading in stack])
+        return paths
+
+    def _encode_paragraphs(self, sections: List[str]) -> List[List[List[int]]]:
+        """Split sections into paragraphs and encode them in a single batch."""
+        section_paragraphs = [section.split('\n\n') for section in sections]
+        all_paragraphs = [
+            para for paragraphs in section_paragraphs for para in paragraphs
+        ]
+        all_tokens = self.tokenizer.encode_ordinary_batch(
+            all_paragraphs, num_threads=os.cpu_count())
+
+        # Regroup the flat token lists per section
+        encoded_sections = []
+        position = 0
+        for paragraphs in section_paragraphs:
+            encoded_sections.append(
+                all_tokens[position:position + len(paragraphs)])
+            position += len(paragraphs)
+        return encoded_sections
+
+    def _section_token_count(self, paragraph_tokens: List[List[int]]) -> int:
+        """Count tokens of a section from its encoded paragraphs."""
+        separators = len(self._paragraph_separator) * (len(paragraph_tokens) - 1)
+        return sum(len(tokens) for tokens in paragraph_tokens) + separators
+
+    def _split_encoded_section(self, paragraph_tokens: List[List[int]],
+                               max_tokens: int) -> List[str]:
+        """Split an encoded section into chunks of at most max_tokens.
+
+        Sections that are too large are cut into windows of max_tokens
+        tokens that overlap by overlap_size tokens. Each window is decoded
+        once, when emitted.
+        """
+        section_tokens: List[int] = []
+        for tokens in paragraph_tokens:
+            if section_tokens:
+                section_tokens.extend(self._paragraph_separator)
+            section_tokens.extend(tokens)
+
+        if len(section_tokens) <= max_tokens:
+            return [self.tokenizer.decode(section_tokens)]
+
+        stride = max(max_tokens - self.overlap_size, 1)
+        # Stop once the previous window already reached the end
+        last_start = max(len(section_tokens) - self.overlap_size, 1)
+        return [
+            self.tokenizer.decode(section_tokens[start:start + max_tokens])
+            for start in range(0, last_start, stride)
+        ]
 
-            if self._count_tokens(test_chunk) <= max_tokens:
-                current_chunk = test_chunk
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                    # Add overlap from previous chunk
-                    overlap_text = self._get_text_overlap(
-                        current_chunk, self.overlap_size)
-                    current_chunk = overlap_text + "\n\n" + para
-                else:
-                    # Single paragraph too large - split more aggressively
-                    current_chunk = para
-                
-                # If current chunk is still too large, split it by sentences
-                while self._count_tokens(current_chunk) > max_tokens:
-                    # Find a reasonable split point
-                    sentences = current_chunk.split('. ')
-                    if len(sentences) <= 1:
-                        # Can't split further, just use what we have
-                        break
-                    
-                    # Take roughly half the sentences
-                    split_point = len(sentences) // 2
-                    first_part = '. '.join(sentences[:split_point]) + '.'
-                    second_part = '. '.join(sentences[split_point:])
-                    
-                    chunks.append(first_part)
-                    current_chunk = second_part
-
-        if current_chunk:
-            chunks.append(current_chunk)
+    def _get_text_overlap(self, text: str, overlap_tokens: int,
+                          tokens: Optional[List[int]] = None) -> str:
+        """Get last N tokens worth of text for overlap.
 
-        return chunks
-
-    def _get_text_overlap(self, text: str, overlap_tokens: int) -> str:
-        """Get last N tokens worth of text for overlap."""
-        tokens = self.tokenizer.encode(text)
+        Pass the already encoded tokens of text to avoid encoding it again.
+        """
+        if tokens is None:
+            tokens = self.tokenizer.encode_ordinary(text)
         if len(tokens) <= overlap_tokens:
             return text
 
         overlap_token_ids = tokens[-overlap_tokens:]
         return self.tokenizer.decode(overlap_token_ids)
 
-    def _create_chunks(self, file_path: Path,
-                       content: str) -> List[DocumentChunk]:
+    def _create_chunks(self, file_path: Path, content: str,
+                       content_hash: Optional[str] = None) -> List[DocumentChunk]:
         """Create chunks from markdown content."""
+        if content_hash is None:
+            content_hash = blake3(content.encode('utf-8')).hexdigest()
+
         base_metadata = self._extract_metadata_from_path(file_path)
-        heading_hierarchy = self._extract_heading_hierarchy(content)
+        base_metadata["content_hash"] = content_hash
+        doc_url = f"/{base_metadata['file_path'].replace('.md', '.html')}"
+        # Chunk IDs only differ by index, build the shared part once
+        id_prefix = f"{self.version}/{base_metadata['file_path']}|{content_hash}|"
+        # Scan for headings once, both the title and the sections use them
+        headings = list(_HEADING_RE.finditer(content))
+        heading_hierarchy = self._extract_heading_hierarchy(content, headings)
 
         # Extract title from first heading or filename
         title = heading_hierarchy[
             0] if heading_hierarchy else file_path.stem.replace('_',
                                                                 ' ').title()
 
-        # Split by headers first
-        sections = self._split_by_headers(content)
+        # Split by headers first, then encode all paragraphs in one batch
+        sections = deque(
+            (paragraphs, self._section_token_count(paragraphs), heading_path)
+            for paragraphs, heading_path in zip(
+                self._encode_paragraphs(
+                    self._split_by_headers(content, headings)),
+                self._section_heading_paths(headings)))
 
         chunks = []
-        i = 0
-        while i < len(sections):
-            section = sections[i]
+        carry: List[List[int]] = []
+        carry_count = 0
+        carry_path: List[str] = []
+        while sections:
+            section, token_count, heading_path = sections.popleft()
+
+            # Prepend small sections carried over from previous iterations
+            if carry:
+                carry.extend(section)
+                section = carry
+                token_count += carry_count + len(self._paragraph_separator)
+                # Only the headings both sections are nested under apply
+                heading_path = os.path.commonprefix([carry_path, heading_path])
+                carry, carry_count, carry_path = [], 0, []
             
             # Skip very small sections unless they're the only content or last section
-            if (len(sections) > 1 and 
-                self._count_tokens(section) < self.min_chunk_size and 
-                i < len(sections) - 1):
+            if sections and token_count < self.min_chunk_size:
                 # Try to merge with next section
-                sections[i + 1] = section + "\n\n" + sections[i + 1]
-                i += 1
+                carry, carry_count, carry_path = (section, token_count,
+                                                  heading_path)
                 continue
 
             # Split large sections
-            section_chunks = self._split_large_section(section,
-                                                       self.target_chunk_size)
+            section_chunks = self._split_encoded_section(section,
+                                                         self.target_chunk_size)
 
             for j, chunk_content in enumerate(section_chunks):
-                if not chunk_content.strip():
+                chunk_text = chunk_content.strip()
+                if not chunk_text:
                     continue
 
-                # Create chunk metadata
-                chunk_metadata = base_metadata.copy()
-                chunk_metadata.update({
-                    "title":
-                    title,
-                    "heading_path":
-                    heading_hierarchy,
-                    "has_code":
-                    self._detect_code_blocks(chunk_content),
-                    "chunk_index":
-                    len(chunks),
-                    "doc_url":
-                    f"/{base_metadata['file_path'].replace('.md', '.html')}"
-                })
-
-                # Create unique chunk ID
-                chunk_id = hashlib.md5(
-                    f"{file_path}_{len(chunks)}_{chunk_content[:100]}".encode(
-                    )).hexdigest()
-
-                chunk = DocumentChunk(content=chunk_content.strip(),
+                # Create chunk metadata from the per-file base
+                chunk_metadata = {
+                    **base_metadata,
+                    "title": title,
+                    "heading_path": heading_path,
+                    "has_code": self._detect_code_blocks(chunk_content),
+                    "chunk_index": len(chunks),
+                    "doc_url": doc_url,
+                }
+
+                # Deterministic chunk ID (Qdrant point IDs must be UUIDs), so
+                # re-uploading unchanged content replaces the same points
+                chunk_id = str(uuid.uuid5(uuid.NAMESPACE_URL,
+                                          f"{id_prefix}{len(chunks)}"))
+
+                chunk = DocumentChunk(content=chunk_text,
                                       metadata=chunk_metadata,
-                                      chunk_id=chunk_id)
+                                      chunk_id=chunk_id,
+                                      token_count=min(token_count,
+                                                      self.target_chunk_size))
                 chunks.append(chunk)
-                self.chunks_created += 1
-            
-            i += 1
+
+        with self._state_lock:
+            self.chunks_created += len(chunks)
 
         return chunks
 
     def _create_embeddings(self,
                            chunks: List[DocumentChunk]) -> List[List[float]]:
-        """Create embeddings for chunks using Azure OpenAI with rate limiting."""
+        """Create embeddings for chunks using Azure OpenAI with rate limiting.
+
+        Chunks are sent in as many requests as embedding_batch_size and
+        embedding_batch_tokens require, so a single large file is split too.
+        """
         if not chunks:
             return []
 
-        texts = [chunk.content for chunk in chunks]
-        
+        embeddings = []
+        for request_chunks in self._split_embedding_requests(chunks):
+            embeddings.extend(self._request_embeddings(
+                [chunk.content for chunk in request_chunks]))
+        return embeddings
+
+    def _split_embedding_requests(
+            self, chunks: List[DocumentChunk]) -> Iterator[List[DocumentChunk]]:
+        """Group chunks into requests within the input count and token caps."""
+        request: List[DocumentChunk] = []
+        request_tokens = 0
+        for chunk in chunks:
+            if request and (
+                    len(request) >= self.embedding_batch_size
+                    or request_tokens + chunk.token_count >
+                    self.embedding_batch_tokens):
+                yield request
+                request = []
+                request_tokens = 0
+            request.append(chunk)
+            request_tokens += chunk.token_count
+        if request:
+            yield request
+
+    def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Send one embeddings request, retrying on rate limit errors."""
         for attempt in range(self.max_retries):
             try:
-                # Add small delay between requests to avoid rate limits
+                # Back off before retrying a failed request
                 if attempt > 0:
                     delay = self.base_delay * (2 ** attempt) + random.uniform(0, 1)
                     logger.info(f"Retrying embedding creation after {delay:.2f}s delay (attempt {attempt + 1}/{self.max_retries})")
                     time.sleep(delay)
-                elif len(texts) > 1:
-                    # Small delay even on first attempt for batch requests
-                    time.sleep(self.batch_delay)
+                # Wait only when the request budget is used up
+                self.rate_limiter.acquire()
 
                 response = self.openai_client.embeddings.create(
                     input=texts,
@@ -398,121 +743,415 @@ class FlameDocsProcessor:
         raise Exception(f"Failed to create embeddings after {self.max_retries} attempts")
 
     def _store_in_qdrant(self, chunks: List[DocumentChunk],
-                         embeddings: List[List[float]]):
-        """Store chunks and embeddings in Qdrant."""
+                         embeddings: List[List[float]], wait: bool = True):
+        """Store chunks and embeddings in Qdrant.
+
+        Points are sent in requests of up to upsert_batch_size points. Only
+        the last request honours `wait`, earlier ones are acknowledged once
+        Qdrant has written them to its write-ahead log.
+
+        When chunks belong to changed files, the deletes of their old points
+        and the upserts are sent together in one batch_update_points request.
+        """
         if len(chunks) != len(embeddings):
             raise ValueError("Number of chunks and embeddings must match")
 
-        points = []
-        for chunk, embedding in zip(chunks, embeddings):
-            # Include content in the payload along with metadata
-            payload = chunk.metadata.copy()
-            payload["content"] = chunk.content
-            
-            point = PointStruct(id=chunk.chunk_id,
-                                vector=embedding,
-                                payload=payload)
-            points.append(point)
+        # Include content in the payload along with metadata
+        points = [
+            PointStruct(id=chunk.chunk_id,
+                        vector=embedding,
+                        payload={**chunk.metadata, "content": chunk.content})
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
+
+        with self._state_lock:
+            stale = self._stale_files.intersection(
+                chunk.metadata.get("file_path") for chunk in chunks)
 
+        self._pause_indexing()
         try:
-            self.qdrant_client.upsert(collection_name=self.collection_name,
-                                      points=points)
+            if stale:
+                self._replace_points(sorted(stale), points, wait)
+            else:
+                # Always send one request, even for an empty list of points
+                starts = range(0, max(len(points), 1), self.upsert_batch_size)
+                for start in starts:
+                    self.qdrant_client.upsert(
+                        collection_name=self.collection_name,
+                        points=points[start:start + self.upsert_batch_size],
+                        wait=wait if start == starts[-1] else False)
             logger.debug(f"Stored {len(points)} points in Qdrant")
         except Exception as e:
             logger.error(f"Error storing in Qdrant: {e}")
             raise
 
-    def _process_file(self, file_path: Path) -> bool:
-        """Process a single markdown file."""
-        try:
-            # Check if already processed
+    def _replace_points(self, relative_paths: List[str],
+                        points: List[PointStruct], wait: bool):
+        """Delete the old points of files and upsert new ones in one request.
+
+        Operations run in order, so the deletes never remove the new points.
+        """
+        operations = [
+            models.DeleteOperation(delete=self._file_points_selector(path))
+            for path in relative_paths
+        ]
+        operations.extend(
+            models.UpsertOperation(upsert=models.PointsList(
+                points=points[start:start + self.upsert_batch_size]))
+            for start in range(0, len(points), self.upsert_batch_size))
+
+        self.qdrant_client.batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=operations,
+            wait=wait)
+
+        with self._state_lock:
+            self._stale_files.difference_update(relative_paths)
+
+    def _file_points_selector(self, relative_path: str) -> models.FilterSelector:
+        """Select the points stored for a file in this version."""
+        return models.FilterSelector(filter=models.Filter(must=[
+            models.FieldCondition(
+                key="file_path",
+                match=models.MatchValue(value=relative_path)),
+            models.FieldCondition(
+                key="version",
+                match=models.MatchValue(value=self.version)),
+        ]))
+
+    def _delete_file_points(self, file_path: Path):
+        """Delete the points previously stored for a file and forget the file."""
+        relative_path = self._extract_metadata_from_path(file_path)["file_path"]
+        self.qdrant_client.delete(
+            collection_name=self.collection_name,
+            points_selector=self._file_points_selector(relative_path))
+        with self._state_lock:
+            self._stale_files.discard(relative_path)
+            self.processed_files.discard(str(file_path))
+            self.file_hashes.pop(str(file_path), None)
+            self._state_dirty = True
+            self._connect_state_db().execute(
+                "DELETE FROM processed WHERE path = ?", (str(file_path),))
+
+    def _load_chunks(self, file_path: Path) -> List[DocumentChunk]:
+        """Read a markdown file and split it into chunks.
+
+        Returns no chunks for empty files and for files that were already
+        processed with the same content.
+        """
+        size = file_path.stat().st_size
+        if size < _MIN_FILE_SIZE:
+            logger.warning(f"Empty file: {file_path}")
+            # A file truncated since it was ingested leaves no chunks behind
             if str(file_path) in self.processed_files:
-                logger.debug(f"Skipping already processed: {file_path}")
-                return True
+                self._delete_file_points(file_path)
+            return []
 
-            # Read file content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+        with _open_markdown(file_path, size) as data:
+            # Hash the raw bytes, unchanged files are skipped without decoding
+            content_hash = blake3(data).hexdigest()
+            if str(file_path) in self.processed_files:
+                recorded_hash = self.file_hashes.get(str(file_path))
+                # Entries from state files without hashes are trusted as-is
+                if recorded_hash is None or recorded_hash == content_hash:
+                    logger.debug(f"Skipping already processed: {file_path}")
+                    return []
 
-            if not content.strip():
-                logger.warning(f"Empty file: {file_path}")
-                return True
+                logger.info(f"Content changed, reprocessing: {file_path}")
+                # Old points are replaced when the new chunks are stored
+                relative_path = self._extract_metadata_from_path(
+                    file_path)["file_path"]
+                with self._state_lock:
+                    self._stale_files.add(relative_path)
+
+            content = str(data, 'utf-8')
+
+        # Create chunks
+        chunks = (self._create_chunks(file_path, content, content_hash)
+                  if content.strip() else [])
+
+        if not chunks:
+            logger.warning(f"No chunks created for: {file_path}")
+            # Nothing will replace the old points, remove them now
+            if str(file_path) in self.processed_files:
+                self._delete_file_points(file_path)
+
+        return chunks
 
-            # Create chunks
-            chunks = self._create_chunks(file_path, content)
+    def _store_file(self, file_path: Path, chunks: List[DocumentChunk],
+                    embeddings: List[List[float]]):
+        """Store a file's chunks in Qdrant and mark the file as processed."""
+        self._store_in_qdrant(chunks, embeddings)
+        self._mark_processed(file_path, chunks)
+
+    def _mark_processed(self, file_path: Path, chunks: List[DocumentChunk]):
+        """Record a file and its content hash as processed."""
+        content_hash = chunks[0].metadata["content_hash"]
+        # One string shared by the set and the dict, not a copy for each
+        path = str(file_path)
+        with self._state_lock:
+            self.processed_files.add(path)
+            self.file_hashes[path] = content_hash
+            self._state_dirty = True
+            self._record_processed(file_path, content_hash, len(chunks))
+
+        logger.info(f"Processed {file_path}: {len(chunks)} chunks")
+
+    def _record_error(self, file_path: Path, error: Exception):
+        """Record a processing error for a file."""
+        error_info = {
+            "file": str(file_path),
+            "error": str(error),
+            "timestamp": datetime.now().isoformat()
+        }
+        self.errors.append(error_info)
+        logger.error(f"Error processing {file_path}: {error}")
 
+    def _process_file(self, file_path: Path) -> bool:
+        """Process a single markdown file."""
+        try:
+            chunks = self._load_chunks(file_path)
             if not chunks:
-                logger.warning(f"No chunks created for: {file_path}")
                 return True
 
             # Create embeddings
             embeddings = self._create_embeddings(chunks)
 
             # Store in Qdrant
-            self._store_in_qdrant(chunks, embeddings)
-
-            # Mark as processed
-            self.processed_files.add(str(file_path))
-
-            logger.info(f"Processed {file_path}: {len(chunks)} chunks")
+            self._store_file(file_path, chunks, embeddings)
             return True
 
         except Exception as e:
-            error_info = {
-                "file": str(file_path),
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
-            self.errors.append(error_info)
-            logger.error(f"Error processing {file_path}: {e}")
+            self._record_error(file_path, e)
             return False
 
-    def process_all_files(self):
-        """Process all markdown files in the source directory."""
-        # Find all markdown files
-        md_files = list(self.source_dir.rglob("*.md"))
+    def _embed_batch(
+        self, batch: List[Tuple[Path, List[DocumentChunk]]]
+    ) -> Tuple[List[Tuple[Path, List[DocumentChunk], List[List[float]]]],
+               List[Tuple[Path, bool]]]:
+        """Embed the chunks of several files with one request.
 
-        if not md_files:
-            logger.error(f"No markdown files found in {self.source_dir}")
-            return
+        If the shared request fails, each file is retried on its own so a
+        single bad file does not fail the whole batch.
 
-        logger.info(f"Found {len(md_files)} markdown files")
+        Returns:
+            The embedded files as (path, chunks, embeddings) and the
+            (path, False) results of files that could not be embedded.
+        """
+        chunks = [chunk for _, file_chunks in batch for chunk in file_chunks]
 
-        # Filter out already processed files for progress bar
-        remaining_files = [
-            f for f in md_files if str(f) not in self.processed_files
+        try:
+            embeddings = self._create_embeddings(chunks)
+            if len(embeddings) != len(chunks):
+                raise ValueError(
+                    f"Expected {len(chunks)} embeddings, got {len(embeddings)}")
+        except Exception as e:
+            if len(batch) == 1:
+                self._record_error(batch[0][0], e)
+                return [], [(batch[0][0], False)]
+
+            logger.warning(
+                f"Embedding batch of {len(batch)} files failed ({e}), "
+                f"retrying files individually")
+            embedded = []
+            failed = []
+            for item in batch:
+                item_embedded, item_failed = self._embed_batch([item])
+                embedded.extend(item_embedded)
+                failed.extend(item_failed)
+            return embedded, failed
+
+        # Hand each file its slice of the embeddings
+        embedded = []
+        position = 0
+        for file_path, file_chunks in batch:
+            embedded.append(
+                (file_path, file_chunks,
+                 embeddings[position:position + len(file_chunks)]))
+            position += len(file_chunks)
+
+        return embedded, []
+
+    def _store_batch(
+        self,
+        embedded: List[Tuple[Path, List[DocumentChunk], List[List[float]]]]
+    ) -> List[Tuple[Path, bool]]:
+        """Store several embedded files with one upsert.
+
+        If the shared upsert fails, each file is retried on its own. Upserts
+        do not wait for Qdrant to apply them, only to log them durably.
+        """
+        chunks = [chunk for _, file_chunks, _ in embedded
+                  for chunk in file_chunks]
+        embeddings = [embedding for _, _, file_embeddings in embedded
+                      for embedding in file_embeddings]
+
+        try:
+            self._store_in_qdrant(chunks, embeddings, wait=False)
+        except Exception as e:
+            if len(embedded) == 1:
+                self._record_error(embedded[0][0], e)
+                return [(embedded[0][0], False)]
+
+            logger.warning(
+                f"Upsert of {len(embedded)} files failed ({e}), "
+                f"retrying files individually")
+            results = []
+            for item in embedded:
+                results.extend(self._store_batch([item]))
+            return results
+
+        for file_path, file_chunks, _ in embedded:
+            self._mark_processed(file_path, file_chunks)
+
+        return [(file_path, True) for file_path, _, _ in embedded]
+
+    async def _process_files_concurrently(
+            self, files: Iterable[Path]) -> Tuple[int, int]:
+        """Process files through a chunk -> embed -> upsert pipeline.
+
+        Files are chunked one at a time as they are found and packed into
+        batches of up to embedding_batch_size chunks and
+        embedding_batch_tokens tokens. Embedding and upsert workers run in
+        threads (`concurrency` of each), so chunking, Azure OpenAI requests
+        and Qdrant requests overlap instead of running back to back.
+        """
+        # One thread per embed and upsert worker plus one for chunking, the
+        # default executor (cpu_count + 4 threads) would stall workers
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=2 * self.concurrency + 1,
+                               thread_name_prefix="flame-docs"))
+
+        embed_queue = asyncio.Queue(maxsize=self.concurrency)
+        store_queue = asyncio.Queue(maxsize=self.concurrency)
+        counts = {'success': 0, 'failed': 0}
+        pbar = tqdm(desc="Processing files", unit="file")
+
+        def report(results: List[Tuple[Path, bool]]):
+            for file_path, success in results:
+                counts['success' if success else 'failed'] += 1
+                pbar.update(1)
+
+            pbar.set_postfix({
+                'success': counts['success'],
+                'failed': counts['failed'],
+                'chunks': self.chunks_created
+            })
+
+        async def embed_worker():
+            while True:
+                batch = await embed_queue.get()
+                try:
+                    embedded, failed = await asyncio.to_thread(
+                        self._embed_batch, batch)
+                    report(failed)
+                    if embedded:
+                        await store_queue.put(embedded)
+                except Exception as e:
+                    logger.error(f"Embedding worker error: {e}")
+                finally:
+                    embed_queue.task_done()
+
+        async def store_worker():
+            while True:
+                embedded = await store_queue.get()
+                try:
+                    report(await asyncio.to_thread(self._store_batch, embedded))
+                except Exception as e:
+                    logger.error(f"Upsert worker error: {e}")
+                finally:
+                    store_queue.task_done()
+
+        workers = [
+            asyncio.create_task(worker())
+            for worker in (embed_worker, store_worker)
+            for _ in range(self.concurrency)
         ]
 
-        logger.info(f"Processing {len(remaining_files)} remaining files")
+        try:
+            batch = []
+            batch_size = 0
+            batch_tokens = 0
+            for file_path in files:
+                try:
+                    chunks = await asyncio.to_thread(self._load_chunks,
+                                                     file_path)
+                except Exception as e:
+                    self._record_error(file_path, e)
+                    report([(file_path, False)])
+                    continue
 
-        # Process files with progress bar
-        successful = 0
-        failed = 0
+                if not chunks:
+                    report([(file_path, True)])
+                    continue
 
-        with tqdm(remaining_files, desc="Processing files") as pbar:
-            for file_path in pbar:
-                pbar.set_description(f"Processing {file_path.name}")
+                file_tokens = sum(chunk.token_count for chunk in chunks)
+                if batch and (
+                        batch_size + len(chunks) > self.embedding_batch_size
+                        or batch_tokens + file_tokens >
+                        self.embedding_batch_tokens):
+                    await embed_queue.put(batch)
+                    batch = []
+                    batch_size = 0
+                    batch_tokens = 0
+
+                batch.append((file_path, chunks))
+                batch_size += len(chunks)
+                batch_tokens += file_tokens
+
+            if batch:
+                await embed_queue.put(batch)
+
+            # Wait for both stages to drain
+            await embed_queue.join()
+            await store_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            pbar.close()
+
+        return counts['success'], counts['failed']
+
+    def _iter_markdown_files(self) -> Iterator[Path]:
+        """Yield the markdown files under source_dir as they are found."""
+        for root, _, names in os.walk(self.source_dir):
+            for name in names:
+                if name.endswith(".md"):
+                    yield Path(root) / name
 
-                if self._process_file(file_path):
-                    successful += 1
-                else:
-                    failed += 1
+    def process_all_files(self):
+        """Process all markdown files in the source directory."""
+        # Walk the markdown files lazily, processing starts with the first one
+        md_files = self._iter_markdown_files()
+        first_file = next(md_files, None)
+
+        if first_file is None:
+            logger.error(f"No markdown files found in {self.source_dir}")
+            return
+        md_files = itertools.chain([first_file], md_files)
 
-                # Save state periodically
-                if (successful + failed) % 10 == 0:
-                    self._save_state()
+        # Previously processed files are still read, they are skipped only
+        # when their content hash is unchanged
+        logger.info(f"{len(self.processed_files)} files processed previously")
 
-                pbar.set_postfix({
-                    'success': successful,
-                    'failed': failed,
-                    'chunks': self.chunks_created
-                })
+        # Pause HNSW indexing once there is something to upload, the index
+        # is then built once at the end
+        self._pause_indexing_on_store = True
+        try:
+            # Process files concurrently with progress bar
+            successful, failed = asyncio.run(
+                self._process_files_concurrently(md_files))
+        finally:
+            self._resume_indexing()
 
         # Final state save
         self._save_state()
+        self._close_state_db()
         self._save_errors()
 
         logger.info(f"Processing complete!")
+        logger.info(f"Markdown files found: {successful + failed}")
         logger.info(f"Successfully processed: {successful} files")
         logger.info(f"Failed: {failed} files")
         logger.info(f"Total chunks created: {self.chunks_created}")
@@ -539,7 +1178,7 @@ def main():
     processor = FlameDocsProcessor(version=args.version)
 
     if args.reset:
-        processor.state_file.unlink(missing_ok=True)
+        processor._reset_state()
         processor.error_file.unlink(missing_ok=True)
         logger.info("Reset processing state")
 
@@ -1,19 +1,51 @@
 import os
+import asyncio
+import copy
 import logging
-from typing import List, Dict, Any, Optional
+import re
+import difflib
+import inspect
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 
+import numpy as np
 from fastmcp import FastMCP
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
-from openai import AzureOpenAI
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Filter, FieldCondition, MatchValue, QueryRequest,
+    SearchParams, QuantizationSearchParams,
+)
+from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
 from starlette.requests import Request
-from starlette.responses import JSONResponse, FileResponse, HTMLResponse
-import os
+from starlette.responses import JSONResponse, HTMLResponse, Response
 
 # Load environment variables
 load_dotenv()
 
+# Configuration, read once at import (the API key is only read by get_openai_client)
+OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION", "2024-02-01")
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+QDRANT_HOST = os.getenv("QDRANT_HOST")
+QDRANT_PORT = os.getenv("QDRANT_PORT")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "flame_docs")
+OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "text-embedding-3-small")
+# Number of query embeddings kept in memory (~6KB each)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+# Queries at least this similar (difflib ratio) to a cached one reuse its embedding;
+# 1.0 (the default) only reuses embeddings of identical normalized queries
+QUERY_CACHE_SIMILARITY = float(os.getenv("QUERY_CACHE_SIMILARITY", "1.0"))
+# Complete tool responses kept for repeated identical calls
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+# Seconds before a query embedding request is abandoned
+QUERY_EMBEDDING_TIMEOUT = float(os.getenv("QUERY_EMBEDDING_TIMEOUT", "30"))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,57 +55,417 @@ logging.getLogger("openai").setLevel(logging.WARNING)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
 
+# Newer fastmcp releases replaced on_duplicate_tools with a single on_duplicate setting
+_ON_DUPLICATE_KWARG = ("on_duplicate"
+                       if "on_duplicate" in inspect.signature(FastMCP).parameters
+                       else "on_duplicate_tools")
+
 mcp = FastMCP(
     name="Flame Knowledge Base",
-    on_duplicate_tools="error",
+    **{_ON_DUPLICATE_KWARG: "error"},
 )
 
 # Static files are served through custom routes below
 
-# Initialize clients
-def _init_clients():
-    """Initialize Azure OpenAI and Qdrant clients."""
-    try:
-        # Initialize Azure OpenAI client
-        openai_client = AzureOpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            api_version=os.getenv("OPENAI_API_VERSION", "2024-02-01"),
-            azure_endpoint=os.getenv("OPENAI_API_BASE"),
-        )
-        
-        # Initialize Qdrant client
-        qdrant_client = QdrantClient(
-            url=os.getenv("QDRANT_HOST"),
-            port=os.getenv("QDRANT_PORT"),
-        )
-        
-        collection_name = os.getenv("COLLECTION_NAME", "flame_docs")
-        
-        return openai_client, qdrant_client, collection_name
-    except Exception as e:
-        logger.error(f"Failed to initialize clients: {e}")
-        raise
+# Shared client instances, created on first use so they bind to the serving event loop
+_openai_client: Optional[AsyncAzureOpenAI] = None
+_qdrant_client: Optional[AsyncQdrantClient] = None
+
+def get_openai_client() -> AsyncAzureOpenAI:
+    """Return the shared async Azure OpenAI client."""
+    global _openai_client
+    if _openai_client is None:
+        try:
+            _openai_client = AsyncAzureOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                api_version=OPENAI_API_VERSION,
+                azure_endpoint=OPENAI_API_BASE,
+            )
+        except Exception as e:
+            logger.error("Failed to initialize Azure OpenAI client: %s", e)
+            raise
+    return _openai_client
+
+def get_qdrant_client() -> AsyncQdrantClient:
+    """Return the shared async Qdrant client."""
+    global _qdrant_client
+    if _qdrant_client is None:
+        try:
+            # gRPC keeps one HTTP/2 channel open for all searches
+            _qdrant_client = AsyncQdrantClient(
+                url=QDRANT_HOST,
+                port=QDRANT_PORT,
+                grpc_port=QDRANT_GRPC_PORT,
+                prefer_grpc=QDRANT_PREFER_GRPC,
+            )
+        except Exception as e:
+            logger.error("Failed to initialize Qdrant client: %s", e)
+            raise
+    return _qdrant_client
+
+
+def _normalize_query(query: str) -> str:
+    """Normalize casing and whitespace so trivial variants share a cache entry."""
+    return " ".join(query.lower().split())
+
+
+# Words that flip the meaning of a query while barely changing its characters
+_NEGATION_WORDS = frozenset({
+    "no", "not", "never", "without", "dont", "don't", "doesnt", "doesn't",
+    "cannot", "can't", "isnt", "isn't",
+})
+
+
+def _query_guard(query: str) -> tuple:
+    """Parts of a normalized query a near match must share exactly."""
+    words = query.split()
+    return (len(words), tuple(
+        word for word in words
+        if word in _NEGATION_WORDS or any(char.isdigit() for char in word)
+    ))
+
+
+class _QueryEmbeddingCache:
+    """Thread-safe LRU cache of query embeddings, optionally serving near-identical queries."""
+
+    def __init__(self, maxsize: int, similarity: float):
+        self.maxsize = maxsize
+        self.similarity = similarity
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Return the embedding of an identical or near-identical cached query."""
+        with self._lock:
+            embedding = self._entries.get(query)
+            if embedding is not None or self.similarity >= 1.0:
+                if embedding is not None:
+                    self._entries.move_to_end(query)
+                return embedding
+            cached_queries = list(self._entries)
+
+        # Scan without holding the lock, other lookups are not blocked
+        match = self._closest(query, cached_queries)
+        if match is None:
+            return None
+        with self._lock:
+            embedding = self._entries.get(match)
+            if embedding is not None:
+                self._entries.move_to_end(match)
+            return embedding
+
+    def _closest(self, query: str, cached_queries: List[str]) -> Optional[str]:
+        """Find a cached query that differs from query only by a typo or punctuation."""
+        # A difflib ratio of at least `similarity` bounds the length difference
+        cutoff = self.similarity
+        shortest = len(query) * cutoff / (2 - cutoff)
+        longest = len(query) * (2 - cutoff) / cutoff if cutoff > 0 else float("inf")
+        # Numbers (e.g. versions) and negations must match exactly
+        guard = _query_guard(query)
+        candidates = [
+            cached for cached in cached_queries
+            if shortest <= len(cached) <= longest and _query_guard(cached) == guard
+        ]
+        matches = difflib.get_close_matches(query, candidates, n=1, cutoff=cutoff)
+        return matches[0] if matches else None
+
+    def put(self, query: str, embedding: np.ndarray):
+        """Cache an embedding, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[query] = embedding
+            self._entries.move_to_end(query)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
 
-# Global client instances
-openai_client, qdrant_client, collection_name = _init_clients()
+class _ResponseCache:
+    """LRU cache of tool responses whose entries expire after a TTL."""
 
-def _create_query_embedding(query: str) -> List[float]:
-    """Create embedding for search query."""
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[list]:
+        """Return a copy of a cached response, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, results = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Copies keep callers from mutating cached results
+        return copy.deepcopy(results)
+
+    def put(self, key: tuple, results: list):
+        """Cache a copy of a response, evicting the least recently used entry if full."""
+        entry = (time.monotonic() + self.ttl, copy.deepcopy(results))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class _EmbeddingBatcher:
+    """Coalesce concurrent query embedding requests into batched API calls.
+
+    Requests arriving within `window` seconds of each other (up to
+    `max_batch` of them) share a single embeddings request. Up to
+    `max_in_flight` batch requests run at the same time.
+    """
+
+    def __init__(self, max_batch: int = 16, window: float = 0.01,
+                 max_in_flight: int = 8):
+        self.max_batch = max_batch
+        self.window = window
+        self.max_in_flight = max_in_flight
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        # Strong references, so running batch tasks are not garbage collected
+        self._batch_tasks: set = set()
+
+    async def embed(self, query: str) -> np.ndarray:
+        """Return the embedding of a query, batched with concurrent requests."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            # Start (or restart) the drain task on the current event loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._task = loop.create_task(self._drain())
+
+        future = loop.create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    async def _drain(self):
+        """Collect queued requests into batches and start embedding each batch."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Wait for a free slot, then go straight back to collecting
+            await self._in_flight.acquire()
+            task = loop.create_task(self._embed_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _embed_batch(self, batch: list):
+        """Embed one batch of queries and resolve their futures."""
+        try:
+            try:
+                response = await get_openai_client().embeddings.create(
+                    input=[query for query, _ in batch],
+                    model=OPENAI_MODEL_NAME,
+                    timeout=QUERY_EMBEDDING_TIMEOUT,
+                )
+                if len(response.data) != len(batch):
+                    raise ValueError(
+                        f"Expected {len(batch)} embeddings, got {len(response.data)}")
+            except Exception as e:
+                self._fail(batch, e)
+                return
+
+            for (_, future), item in zip(batch, response.data):
+                if future.done():
+                    continue
+                try:
+                    embedding = np.asarray(item.embedding, dtype=np.float32)
+                    # Read-only, so cached vectors can be shared without copies
+                    embedding.setflags(write=False)
+                    future.set_result(embedding)
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            self._in_flight.release()
+
+    @staticmethod
+    def _fail(batch: list, error: Exception):
+        """Fail every request of a batch that is still waiting."""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+
+# Terms used to boost search results, each list compiled into one
+# case-insensitive alternation so a text is scanned once per list
+_GUIDE_CONTENT_RE = re.compile("tutorial|guide|example", re.IGNORECASE)
+_IMPL_QUERY_RE = re.compile("how to|example|implement|create|build|code|method", re.IGNORECASE)
+_UI_QUERY_RE = re.compile(r"\b(?:ui|menus?|screens?|overlays?|widgets?|buttons?|navigation)\b", re.IGNORECASE)
+_UI_CONTENT_RE = re.compile(r"\b(?:overlays?|widgets?|menus?|screens?|ui)\b", re.IGNORECASE)
+
+# Payload fields returned by searches, and their defaults when missing
+_RESULT_PAYLOAD_FIELDS = [
+    "content", "title", "file_path", "section", "doc_url",
+    "heading_path", "has_code", "content_type", "version",
+]
+_RESULT_PAYLOAD_DEFAULTS = tuple(zip(
+    _RESULT_PAYLOAD_FIELDS,
+    ("", "", "", "", "", (), False, "", ""),
+))
+
+# Search the quantized vectors, then rescore the oversampled candidates
+# with the original vectors to keep recall
+_SEARCH_PARAMS = SearchParams(
+    quantization=QuantizationSearchParams(rescore=True, oversampling=2.0)
+)
+
+_query_embedding_cache = _QueryEmbeddingCache(QUERY_EMBEDDING_CACHE_SIZE,
+                                             QUERY_CACHE_SIMILARITY)
+_response_cache = _ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+_embedding_batcher = _EmbeddingBatcher()
+
+@lru_cache(maxsize=32)
+def _version_filter(version: str) -> Filter:
+    """Build the search filter for a version, once per version."""
+    return Filter(
+        must=[
+            FieldCondition(
+                key="version",
+                match=MatchValue(value=version)
+            )
+        ]
+    )
+
+async def _create_query_embedding(query: str) -> np.ndarray:
+    """Create embedding for search query, reusing cached embeddings when possible."""
     try:
-        response = openai_client.embeddings.create(
-            input=[query],
-            model=os.getenv("OPENAI_MODEL_NAME", "text-embedding-3-small"),
-        )
-        return response.data[0].embedding
+        key = _normalize_query(query)
+        embedding = _query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = await _embedding_batcher.embed(query)
+            _query_embedding_cache.put(key, embedding)
+        return embedding
     except Exception as e:
-        logger.error(f"Failed to create embedding for query: {e}")
+        logger.error("Failed to create embedding for query: %s", e)
         raise
 
+def _boost_scores(base_scores: np.ndarray, title_hits: np.ndarray,
+                  heading_hits: np.ndarray, content_type_hits: np.ndarray,
+                  code_impl_mask: np.ndarray, ui_mask: np.ndarray) -> np.ndarray:
+    """Apply the metadata boosts to an array of similarity scores."""
+    return base_scores * (1.0 + 0.15 * title_hits + 0.1 * heading_hits
+                          + 0.1 * content_type_hits + 0.1 * code_impl_mask
+                          + 0.2 * ui_mask)
+
+
+def _format_result(result, score: float) -> Dict[str, Any]:
+    """Format a search hit for the tool response."""
+    payload = result.payload
+    chunk_data = {field: payload.get(field, default) for field, default in _RESULT_PAYLOAD_DEFAULTS}
+    chunk_data["similarity_score"] = round(float(score), 3)
+    return chunk_data
+
+
+def _rank_results(query: str, search_results: list, limit: int,
+                  min_score: float) -> List[Dict[str, Any]]:
+    """Boost, filter and format search hits, falling back to the best raw hits."""
+    # Lower threshold than min_score, boosting can lift results above it
+    initial_threshold = max(min_score - 0.1, 0.2)
+    
+    # Query-dependent boost inputs, computed once for all results
+    query_terms = set(query.lower().split())
+    impl_query = _IMPL_QUERY_RE.search(query) is not None
+    ui_query = _UI_QUERY_RE.search(query) is not None
+    
+    # Boost inputs for every candidate, then score them all at once
+    candidates = [result for result in search_results if result.score >= initial_threshold]
+    payloads = [result.payload for result in candidates]
+    titles = [payload.get("title", "").lower() for payload in payloads]
+    heading_paths = [" ".join(payload.get("heading_path", [])).lower() for payload in payloads]
+    
+    boosted_scores = _boost_scores(
+        np.fromiter((result.score for result in candidates), dtype=np.float64, count=len(candidates)),
+        title_hits=np.array([sum(term in title for term in query_terms) for title in titles], dtype=np.float64),
+        heading_hits=np.array([sum(term in heading for term in query_terms) for heading in heading_paths], dtype=np.float64),
+        content_type_hits=np.array([
+            _GUIDE_CONTENT_RE.search(payload.get("content_type", "")) is not None
+            for payload in payloads
+        ], dtype=bool),
+        code_impl_mask=np.array([
+            impl_query and bool(payload.get("has_code", False)) for payload in payloads
+        ], dtype=bool),
+        ui_mask=np.array([
+            ui_query and _UI_CONTENT_RE.search(payload.get("content", "")) is not None
+            for payload in payloads
+        ], dtype=bool),
+    )
+    
+    # Keep results that meet the final threshold, best first, up to limit
+    passing = np.flatnonzero(boosted_scores >= min_score)
+    order = passing[np.argsort(-boosted_scores[passing], kind="stable")][:limit]
+    
+    # Format final results
+    results = [_format_result(candidates[i], boosted_scores[i]) for i in order]
+    
+    logger.info("Found %d relevant chunks for query: '%s' (from %d initial results)",
+                len(results), query, len(search_results))
+    
+    # If no results found, fall back to the best raw matches
+    if not results:
+        logger.info("No results with current threshold, using broader matches for: '%s'", query)
+        broader_results = search_results[:5]
+        
+        if broader_results:
+            results = [_format_result(result, result.score) for result in broader_results]
+            logger.info("Broader matches found %d results", len(results))
+    
+    return results
+
+
+def _no_results(query: str, version: Optional[str]) -> List[Dict[str, Any]]:
+    """Build the response returned when nothing relevant was found."""
+    return [{
+        "content": f"No relevant documentation found for query: '{query}'. Try using different terms or check if the documentation has been processed.",
+        "title": "No Results",
+        "file_path": "",
+        "section": "search",
+        "doc_url": "",
+        "heading_path": [],
+        "has_code": False,
+        "content_type": "system",
+        "version": version or "unknown",
+        "similarity_score": 0.0,
+    }]
+
+
+def _search_error(error: Exception, version: Optional[str]) -> List[Dict[str, Any]]:
+    """Build the response returned when a search fails."""
+    return [{
+        "content": f"Error searching knowledge base: {str(error)}",
+        "title": "Search Error",
+        "file_path": "",
+        "section": "error",
+        "doc_url": "",
+        "heading_path": [],
+        "has_code": False,
+        "content_type": "error",
+        "version": version or "unknown",
+        "similarity_score": 0.0,
+    }]
+
+
 @mcp.tool(
     name="get_flame_knowledge",
     tags={},
 )
-def get_flame_knowledge(
+async def get_flame_knowledge(
     query: str,
     version: str | None = None,
     limit: int = 5,
@@ -97,163 +489,122 @@ def get_flame_knowledge(
         list of relevant Flame documentation/references snippets
     """
     try:
-        logger.info(f"Searching Flame knowledge base for: '{query}'")
+        logger.info("Searching Flame knowledge base for: '%s'", query)
+        
+        # Repeated identical calls are answered without embedding or searching
+        cache_key = (_normalize_query(query), version, limit, min_score)
+        cached_results = _response_cache.get(cache_key)
+        if cached_results is not None:
+            logger.info("Returning cached results for query: '%s'", query)
+            return cached_results
         
         # Create embedding for the query
-        query_embedding = _create_query_embedding(query)
+        query_embedding = await _create_query_embedding(query)
         
         # Build search filter - only filter by version if specified
-        search_filter = None
-        if version:
-            search_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="version",
-                        match=MatchValue(value=version)
-                    )
-                ]
-            )
+        search_filter = _version_filter(version) if version else None
         
-        # Perform broader similarity search with lower threshold
-        search_results = qdrant_client.search(
-            collection_name=collection_name,
-            query_vector=query_embedding,
+        # Single broad search; the same hits serve ranking and the fallback below
+        response = await get_qdrant_client().query_points(
+            collection_name=COLLECTION_NAME,
+            query=query_embedding,
             query_filter=search_filter,
-            limit=min(limit * 2, 30),  # Search more broadly first
-            score_threshold=max(min_score - 0.1, 0.2),  # Even lower threshold for initial search
-            with_payload=True,
+            search_params=_SEARCH_PARAMS,
+            limit=max(min(limit * 2, 30), 5),  # Search more broadly first
+            score_threshold=0.1,  # Very low threshold, fallback results included
+            with_payload=_RESULT_PAYLOAD_FIELDS,
         )
+        search_results = response.points
         
-        # Enhanced result ranking with metadata-based boosting
-        enhanced_results = []
-        for result in search_results:
-            payload = result.payload
-            base_score = result.score
-            
-            # Calculate boosted score based on content relevance
-            boost_factor = 1.0
-            
-            # Boost based on content type relevance
-            content_type = payload.get("content_type", "").lower()
-            if any(term in content_type for term in ["tutorial", "guide", "example"]):
-                boost_factor += 0.1
-            
-            # Boost if query terms appear in title or heading path
-            title = payload.get("title", "").lower()
-            heading_path = " ".join(payload.get("heading_path", [])).lower()
-            query_terms = query.lower().split()
-            
-            for term in query_terms:
-                if term in title:
-                    boost_factor += 0.15
-                if term in heading_path:
-                    boost_factor += 0.1
-            
-            # Boost for code examples if query suggests implementation
-            if payload.get("has_code", False) and any(term in query.lower() for term in 
-                ["how to", "example", "implement", "create", "build", "code", "method"]):
-                boost_factor += 0.1
-            
-            # Special boost for UI/overlay related content
-            if any(ui_term in query.lower() for ui_term in ["ui", "menu", "screen", "overlay", "widget", "button", "navigation"]):
-                content_lower = payload.get("content", "").lower()
-                if any(overlay_term in content_lower for overlay_term in ["overlay", "widget", "menu", "screen", "ui"]):
-                    boost_factor += 0.2
-            
-            boosted_score = base_score * boost_factor
-            
-            # Only include results that meet the final threshold
-            if boosted_score >= min_score:
-                enhanced_results.append({
-                    "result": result,
-                    "boosted_score": boosted_score
-                })
+        results = _rank_results(query, search_results, limit, min_score)
         
-        # Sort by boosted score and limit results
-        enhanced_results.sort(key=lambda x: x["boosted_score"], reverse=True)
-        enhanced_results = enhanced_results[:limit]
+        # If still no results, provide helpful message
+        if not results:
+            return _no_results(query, version)
         
-        # Format final results
-        results = []
-        for item in enhanced_results:
-            result = item["result"]
-            chunk_data = {
-                "content": result.payload.get("content", ""),
-                "title": result.payload.get("title", ""),
-                "file_path": result.payload.get("file_path", ""),
-                "section": result.payload.get("section", ""),
-                "doc_url": result.payload.get("doc_url", ""),
-                "heading_path": result.payload.get("heading_path", []),
-                "has_code": result.payload.get("has_code", False),
-                "content_type": result.payload.get("content_type", ""),
-                "version": result.payload.get("version", ""),
-                "similarity_score": round(item["boosted_score"], 3),
-            }
-            results.append(chunk_data)
+        _response_cache.put(cache_key, results)
+        return results
         
-        logger.info(f"Found {len(results)} relevant chunks for query: '{query}' (from {len(search_results)} initial results)")
+    except Exception as e:
+        logger.error("Error searching knowledge base: %s", e)
+        return _search_error(e, version)
+
+
+@mcp.tool(
+    name="get_flame_knowledge_many",
+    tags={},
+)
+async def get_flame_knowledge_many(
+    queries: list[str],
+    version: str | None = None,
+    limit: int = 5,
+    min_score: float = 0.4,
+) -> list:
+    """
+    Same as get_flame_knowledge, but searches several related queries at once.
+    Prefer this over repeated get_flame_knowledge calls when you already know you need more than one search.
+    
+    Args:
+        queries: search queries related to Flame engine
+        version: optional version filter (e.g., "1.29.0")
+        limit: maximum number of results to return per query (default: 5)
+        min_score: minimum similarity score threshold (default: 0.4 for broader results)
+
+    Returns:
+        one list of relevant Flame documentation/references snippets per query, in query order
+    """
+    try:
+        logger.info("Searching Flame knowledge base for %d queries", len(queries))
         
-        # If no results found, try a much broader search
-        if not results:
-            logger.info(f"No results with current threshold, trying broader search for: '{query}'")
-            broader_results = qdrant_client.search(
-                collection_name=collection_name,
-                query_vector=query_embedding,
-                query_filter=search_filter,
-                limit=5,
-                score_threshold=0.1,  # Very low threshold
-                with_payload=True,
+        # Serve repeated queries from the response cache, search the rest
+        cache_keys = [(_normalize_query(query), version, limit, min_score) for query in queries]
+        all_results = [_response_cache.get(key) for key in cache_keys]
+        # Positions of each uncached query, duplicates are searched once
+        pending: Dict[tuple, List[int]] = {}
+        for i, results in enumerate(all_results):
+            if results is None:
+                pending.setdefault(cache_keys[i], []).append(i)
+        
+        if pending:
+            first_positions = [positions[0] for positions in pending.values()]
+            # Concurrent embedding requests are coalesced into batched API calls
+            embeddings = await asyncio.gather(
+                *(_create_query_embedding(queries[i]) for i in first_positions))
+            
+            # One batched Qdrant request for all queries
+            search_filter = _version_filter(version) if version else None
+            responses = await get_qdrant_client().query_batch_points(
+                collection_name=COLLECTION_NAME,
+                requests=[
+                    QueryRequest(
+                        query=embedding,
+                        filter=search_filter,
+                        params=_SEARCH_PARAMS,
+                        limit=max(min(limit * 2, 30), 5),
+                        score_threshold=0.1,
+                        with_payload=_RESULT_PAYLOAD_FIELDS,
+                    )
+                    for embedding in embeddings
+                ],
             )
             
-            if broader_results:
-                results = []
-                for result in broader_results:
-                    chunk_data = {
-                        "content": result.payload.get("content", ""),
-                        "title": result.payload.get("title", ""),
-                        "file_path": result.payload.get("file_path", ""),
-                        "section": result.payload.get("section", ""),
-                        "doc_url": result.payload.get("doc_url", ""),
-                        "heading_path": result.payload.get("heading_path", []),
-                        "has_code": result.payload.get("has_code", False),
-                        "content_type": result.payload.get("content_type", ""),
-                        "version": result.payload.get("version", ""),
-                        "similarity_score": round(result.score, 3),
-                    }
-                    results.append(chunk_data)
-                logger.info(f"Broader search found {len(results)} results")
+            for (key, positions), response in zip(pending.items(), responses):
+                query = queries[positions[0]]
+                results = _rank_results(query, response.points, limit, min_score)
+                if results:
+                    _response_cache.put(key, results)
+                else:
+                    results = _no_results(query, version)
+                all_results[positions[0]] = results
+                # Duplicates get their own copies, like cache hits do
+                for i in positions[1:]:
+                    all_results[i] = copy.deepcopy(results)
         
-        # If still no results, provide helpful message
-        if not results:
-            return [{
-                "content": f"No relevant documentation found for query: '{query}'. Try using different terms or check if the documentation has been processed.",
-                "title": "No Results",
-                "file_path": "",
-                "section": "search",
-                "doc_url": "",
-                "heading_path": [],
-                "has_code": False,
-                "content_type": "system",
-                "version": version or "unknown",
-                "similarity_score": 0.0,
-            }]
-        
-        return results
+        return all_results
         
     except Exception as e:
-        logger.error(f"Error searching knowledge base: {e}")
-        return [{
-            "content": f"Error searching knowledge base: {str(e)}",
-            "title": "Search Error",
-            "file_path": "",
-            "section": "error",
-            "doc_url": "",
-            "heading_path": [],
-            "has_code": False,
-            "content_type": "error",
-            "version": version or "unknown",
-            "similarity_score": 0.0,
-        }]
+        logger.error("Error searching knowledge base: %s", e)
+        return [_search_error(e, version) for _ in queries]
 
 
 @mcp.custom_route("/health", methods=["GET"])
@@ -261,15 +612,31 @@ def health_check(request: Request) -> JSONResponse:
     return JSONResponse({"status": "ok"})
 
 
+@lru_cache(maxsize=None)
+def _load_static_page(path: str) -> Tuple[bytes, str]:
+    """Read a static page once, returning its content and ETag."""
+    stat_result = os.stat(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    return content, f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+def _static_page_response(request: Request, path: str) -> Response:
+    """Serve a cached static page, answering 304 when the client copy is current."""
+    content, etag = _load_static_page(path)
+    headers = {"Cache-Control": "public, max-age=300", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content, headers=headers)
+
 @mcp.custom_route("/", methods=["GET"])
 def root_redirect(request: Request):
     """Redirect root to the web interface."""
-    return FileResponse("web/index.html")
+    return _static_page_response(request, "web/index.html")
 
 @mcp.custom_route("/docs", methods=["GET"])
 def docs_redirect(request: Request):
     """Redirect /docs to the documentation page."""
-    return FileResponse("web/docs.html")
+    return _static_page_response(request, "web/docs.html")
 
 @mcp.custom_route("/api/info", methods=["GET"])
 def server_info(request: Request) -> JSONResponse:
@@ -287,7 +654,7 @@ def server_info(request: Request) -> JSONResponse:
         "connection_info": {
             "description": "This is a Model Context Protocol (MCP) server",
             "usage": "Connect using an MCP client to the /mcp endpoint",
-            "tools": ["get_flame_knowledge"],
+            "tools": ["get_flame_knowledge", "get_flame_knowledge_many"],
             "client_examples": {
                 "fastmcp_client": f'Client("http://{host}:{port}/mcp")',
                 "cursor_config": {
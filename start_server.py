@@ -115,28 +115,34 @@ def main():
     
     print("✅ Environment configuration verified")
     
-    # Check Qdrant connection
-    print("🔍 Testing Qdrant connection...")
-    try:
-        from qdrant_client import QdrantClient
-        client = QdrantClient(
-            url=os.getenv("QDRANT_HOST"),
-            port=os.getenv("QDRANT_PORT"),
-        )
-        
-        # Try to get collection info
-        collection_name = os.getenv("COLLECTION_NAME", "flame_docs")
+    # Check Qdrant connection (readiness probes cover this in Kubernetes)
+    if os.getenv("SKIP_STARTUP_PROBE", "").lower() in ("1", "true", "yes"):
+        print("⏭️  Skipping Qdrant connection check (SKIP_STARTUP_PROBE is set)")
+    else:
+        print("🔍 Testing Qdrant connection...")
         try:
-            info = client.get_collection(collection_name)
-            print(f"✅ Connected to Qdrant - Collection '{collection_name}' found")
-            print(f"   Vectors: {info.vectors_count if hasattr(info, 'vectors_count') else 'unknown'}")
-        except Exception:
-            print(f"⚠️  Collection '{collection_name}' not found - you may need to run the processing pipeline first")
+            from qdrant_client import QdrantClient
+            client = QdrantClient(
+                url=os.getenv("QDRANT_HOST"),
+                port=os.getenv("QDRANT_PORT"),
+            )
+        
+            # Try to get collection info
+            collection_name = os.getenv("COLLECTION_NAME", "flame_docs")
+            try:
+                info = client.get_collection(collection_name)
+                print(f"✅ Connected to Qdrant - Collection '{collection_name}' found")
+                print(f"   Vectors: {info.vectors_count if hasattr(info, 'vectors_count') else 'unknown'}")
+            except Exception:
+                print(f"⚠️  Collection '{collection_name}' not found - you may need to run the processing pipeline first")
+            finally:
+                # The server opens its own async client, don't keep this pool alive
+                client.close()
             
-    except Exception as e:
-        print(f"❌ Failed to connect to Qdrant: {e}")
-        print("   Please ensure Qdrant is running and accessible")
-        sys.exit(1)
+        except Exception as e:
+            print(f"❌ Failed to connect to Qdrant: {e}")
+            print("   Please ensure Qdrant is running and accessible")
+            sys.exit(1)
     
     # Start the server
     if args.http:
@@ -2,12 +2,23 @@
 Shared pytest fixtures for Flame Documentation Processing Pipeline tests
 """
 
+import numpy as np
 import pytest
 from pathlib import Path
 from unittest.mock import Mock, patch
 from process_flame_docs import FlameDocsProcessor, DocumentChunk
 
 
+# Sample 1536-dimension embeddings, built once per session
+SAMPLE_EMBEDDINGS = np.tile(
+    np.array([[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]], dtype=np.float32), 512
+)
+SAMPLE_EMBEDDINGS.setflags(write=False)
+
+# The OpenAI SDK returns embeddings as lists, so mocks share one list copy
+_MOCK_EMBEDDING = SAMPLE_EMBEDDINGS[0].tolist()
+
+
 @pytest.fixture
 def mock_openai_client():
     """Mock Azure OpenAI client with typical responses."""
@@ -15,7 +26,7 @@ def mock_openai_client():
         # Setup typical embedding response
         mock_response = Mock()
         mock_embedding = Mock()
-        mock_embedding.embedding = [0.1, 0.2, 0.3] * 512  # 1536 dimensions
+        mock_embedding.embedding = _MOCK_EMBEDDING  # 1536 dimensions
         mock_response.data = [mock_embedding]
         
         mock_instance = Mock()
@@ -49,7 +60,7 @@ def processor(mock_openai_client, mock_qdrant_client, tmp_path):
     processor.errors = []
     
     # Use temporary state file for each test
-    processor.state_file = tmp_path / "test_state.json"
+    processor.state_file = tmp_path / "test_state.db"
     processor.error_file = tmp_path / "test_errors.json"
     
     return processor
@@ -157,10 +168,7 @@ def sample_chunks():
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_embeddings():
-    """Sample embedding vectors for testing."""
-    return [
-        [0.1, 0.2, 0.3] * 512,  # 1536 dimensions
-        [0.4, 0.5, 0.6] * 512   # 1536 dimensions
-    ] 
\ No newline at end of file
+    """Sample embedding vectors for testing, as the lists the SDK returns."""
+    return SAMPLE_EMBEDDINGS.tolist() 
\ No newline at end of file
@@ -3,6 +3,7 @@ Tests for document chunking functionality
 """
 
 import pytest
+from unittest.mock import patch
 from process_flame_docs import DocumentChunk
 
 
@@ -88,6 +89,41 @@ More content."""
             if heading_path:  # If there are headings
                 assert "Main Title" in heading_path
 
+    def test_create_chunks_heading_path_per_section(self, processor, sample_file_path):
+        """Test that each chunk carries the breadcrumb of its own section."""
+        body = "Details about this part of the document. " * 30
+        content = f"""# Main Title
+{body}
+## Section One
+{body}
+### Subsection
+{body}
+## Section Two
+{body}"""
+        
+        chunks = processor._create_chunks(sample_file_path, content)
+        
+        assert [chunk.metadata["heading_path"] for chunk in chunks] == [
+            ["Main Title"],
+            ["Main Title", "Section One"],
+            ["Main Title", "Section One", "Subsection"],
+            ["Main Title", "Section Two"],
+        ]
+
+
+    def test_create_chunks_merged_siblings_share_parent_path(self, processor, sample_file_path):
+        """Test that merged sibling sections keep only their common breadcrumb."""
+        content = """# A
+## B
+Short.
+## C
+Also short."""
+        
+        chunks = processor._create_chunks(sample_file_path, content)
+        
+        assert len(chunks) == 1
+        assert chunks[0].metadata["heading_path"] == ["A"]
+
 
 class TestSectionSplitting:
     """Test section splitting by headers."""
@@ -114,19 +150,22 @@ class TestSectionSplitting:
         assert len(sections) == 1
         assert sections[0] == content
     
-    def test_split_large_section(self, processor):
-        """Test splitting large sections with overlap."""
-        large_section = "# Large Section\n\n" + ("This is content. " * 300)
-        
-        chunks = processor._split_large_section(large_section, processor.target_chunk_size)
-        
-        # Should create multiple chunks
-        if processor._count_tokens(large_section) > processor.target_chunk_size:
-            assert len(chunks) > 1
-        
-        # Each chunk should be within size limits
-        for chunk in chunks:
-            assert processor._count_tokens(chunk) <= processor.target_chunk_size + processor.overlap_size
+    def test_split_encoded_section_sliding_window(self, processor):
+        """Test that large sections are cut into fixed, overlapping windows."""
+        words = " ".join(f"word{i}" for i in range(2000))
+        tokens = processor.tokenizer.encode_ordinary(words)
+        max_tokens = processor.target_chunk_size
+        stride = max_tokens - processor.overlap_size
+
+        chunks = processor._split_encoded_section([tokens], max_tokens)
+
+        expected = [
+            processor.tokenizer.decode(tokens[start:start + max_tokens])
+            for start in range(0, len(tokens) - processor.overlap_size, stride)
+        ]
+        assert chunks == expected
+        # Last window reaches the end of the section
+        assert chunks[-1].endswith("word1999")
 
 
 class TestTextOverlap:
@@ -158,6 +197,17 @@ class TestTextOverlap:
         # Should return the entire text
         assert overlap_text == short_text
 
+    def test_get_text_overlap_from_tokens(self, processor):
+        """Test that overlap reuses already encoded tokens."""
+        text = "This is a longer piece of text for testing overlap functionality."
+        tokens = processor.tokenizer.encode_ordinary(text)
+        
+        with patch.object(processor, 'tokenizer', wraps=processor.tokenizer) as tokenizer:
+            overlap_text = processor._get_text_overlap(text, 5, tokens=tokens)
+        
+        tokenizer.encode_ordinary.assert_not_called()
+        assert overlap_text == processor.tokenizer.decode(tokens[-5:])
+
 
 class TestCodeDetection:
     """Test code block detection."""
@@ -185,6 +235,11 @@ More text."""
         """Test detection with substantial code content."""
         assert processor._detect_code_blocks(code_heavy_content) is True
     
+    def test_detect_code_blocks_single_backtick(self, processor):
+        """Test that an unpaired backtick is not treated as code."""
+        content = "Use the ` key to open the developer console in the game."
+        assert processor._detect_code_blocks(content) is False
+    
     def test_detect_code_blocks_none(self, processor):
         """Test detection with no code."""
         content = "This is just plain text with no code blocks or inline code."
@@ -5,7 +5,7 @@ Tests for embedding creation and management
 import pytest
 import time
 from unittest.mock import Mock, patch
-from process_flame_docs import DocumentChunk
+from process_flame_docs import DocumentChunk, TokenBucket
 
 
 class TestEmbeddingCreation:
@@ -59,6 +59,40 @@ class TestEmbeddingCreation:
         assert len(embeddings) == 1
         assert len(embeddings[0]) == 1536
     
+    def test_create_embeddings_split_by_input_count(self, processor):
+        """Test that one file's chunks are split when they exceed the input cap."""
+        chunks = [
+            DocumentChunk(content=f"Chunk {i}", metadata={}, chunk_id=str(i),
+                          token_count=10)
+            for i in range(5)
+        ]
+        processor.embedding_batch_size = 2
+        processor.openai_client.embeddings.create.side_effect = (
+            lambda input, model: Mock(data=[Mock(embedding=[0.1] * 1536) for _ in input]))
+        
+        embeddings = processor._create_embeddings(chunks)
+        
+        assert len(embeddings) == 5
+        sizes = [len(call[1]['input'])
+                 for call in processor.openai_client.embeddings.create.call_args_list]
+        assert sizes == [2, 2, 1]
+    
+    def test_create_embeddings_split_by_tokens(self, processor):
+        """Test that chunks are split when they exceed the token budget."""
+        chunks = [
+            DocumentChunk(content=f"Chunk {i}", metadata={}, chunk_id=str(i),
+                          token_count=600)
+            for i in range(3)
+        ]
+        processor.embedding_batch_tokens = 1000
+        processor.openai_client.embeddings.create.side_effect = (
+            lambda input, model: Mock(data=[Mock(embedding=[0.1] * 1536) for _ in input]))
+        
+        embeddings = processor._create_embeddings(chunks)
+        
+        assert len(embeddings) == 3
+        assert processor.openai_client.embeddings.create.call_count == 3
+    
     def test_create_embeddings_api_error(self, processor, sample_chunks):
         """Test handling of non-rate-limit API errors."""
         # Mock API to raise a non-rate-limit error
@@ -116,16 +150,38 @@ class TestEmbeddingCreation:
         # Should have retried the maximum number of times
         assert processor.openai_client.embeddings.create.call_count == 2
     
-    def test_create_embeddings_batch_delay(self, processor, sample_chunks):
-        """Test that batch requests include a small delay."""
-        processor.batch_delay = 0.01  # Short delay for testing
+    def test_create_embeddings_rate_limited(self, processor, sample_chunks):
+        """Test that every embedding request takes from the rate limiter."""
+        processor.rate_limiter = Mock()
         
-        start_time = time.time()
         processor._create_embeddings(sample_chunks)
-        end_time = time.time()
         
-        # Should have included the batch delay
-        assert end_time - start_time >= processor.batch_delay
+        processor.rate_limiter.acquire.assert_called_once_with()
+
+
+class TestTokenBucket:
+    """Test the request rate limiter."""
+    
+    def test_burst_does_not_wait(self):
+        """Test that requests within the capacity pass immediately."""
+        bucket = TokenBucket(rate=1.0, capacity=5)
+        
+        with patch('process_flame_docs.time.sleep') as mock_sleep:
+            for _ in range(5):
+                bucket.acquire()
+        
+        mock_sleep.assert_not_called()
+    
+    def test_empty_bucket_waits_for_refill(self):
+        """Test that requests beyond the capacity wait for the refill rate."""
+        bucket = TokenBucket(rate=10.0, capacity=1)
+        
+        with patch('process_flame_docs.time.sleep') as mock_sleep:
+            bucket.acquire()
+            bucket.acquire()
+        
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args[0][0] == pytest.approx(0.1, abs=0.01)
 
 
 class TestEmbeddingConfiguration:
@@ -136,7 +192,7 @@ class TestEmbeddingConfiguration:
         # Should have default values
         assert processor.max_retries >= 1
         assert processor.base_delay > 0
-        assert processor.batch_delay >= 0
+        assert processor.rate_limiter.rate > 0
     
     def test_embedding_model_configuration(self, processor):
         """Test that embedding model is configurable."""
@@ -4,7 +4,18 @@ Integration tests for the complete processing pipeline
 
 import pytest
 from pathlib import Path
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
+
+
+def _embedding_response(*args, **kwargs):
+    """Return one mock embedding per input text."""
+    mock_response = Mock()
+    mock_response.data = []
+    for _ in kwargs.get('input', []):
+        mock_embedding = Mock()
+        mock_embedding.embedding = [0.1] * 1536
+        mock_response.data.append(mock_embedding)
+    return mock_response
 
 
 class TestFileProcessing:
@@ -81,7 +92,74 @@ More content after the code block.
         
         # Should not call embedding API
         processor.openai_client.embeddings.create.assert_not_called()
-    
+
+    def test_process_unchanged_file_skipped(self, processor, tmp_path):
+        """Test that a file is not re-uploaded when its content is unchanged."""
+        test_file = processor.source_dir / "unchanged.md"
+        test_file.write_text("# Test\nContent here.")
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
+
+        assert processor._process_file(test_file) is True
+        assert processor._process_file(test_file) is True
+
+        # Only the first run should embed and store
+        assert processor.openai_client.embeddings.create.call_count == 1
+        assert processor.qdrant_client.upsert.call_count == 1
+        processor.qdrant_client.delete.assert_not_called()
+
+    def test_process_changed_file_reprocessed(self, processor, tmp_path):
+        """Test that a changed file replaces its previously stored points."""
+        test_file = processor.source_dir / "changed.md"
+        test_file.write_text("# Test\nContent here.")
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
+
+        assert processor._process_file(test_file) is True
+        first_hash = processor.file_hashes[str(test_file)]
+
+        test_file.write_text("# Test\nUpdated content here.")
+        assert processor._process_file(test_file) is True
+
+        assert processor.openai_client.embeddings.create.call_count == 2
+        assert processor.file_hashes[str(test_file)] != first_hash
+
+        # Old points are deleted and new ones upserted in a single request
+        assert processor.qdrant_client.upsert.call_count == 1
+        processor.qdrant_client.delete.assert_not_called()
+        processor.qdrant_client.batch_update_points.assert_called_once()
+        operations = processor.qdrant_client.batch_update_points.call_args[1]['update_operations']
+        assert [type(op).__name__ for op in operations] == ['DeleteOperation', 'UpsertOperation']
+        assert processor._stale_files == set()
+
+    def test_process_changed_file_emptied_deletes_points(self, processor, tmp_path):
+        """Test that a file changed to blank content has its points removed."""
+        test_file = processor.source_dir / "emptied.md"
+        test_file.write_text("# Test\nContent here.")
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
+
+        assert processor._process_file(test_file) is True
+
+        test_file.write_text(" " * 32)
+        assert processor._process_file(test_file) is True
+
+        processor.qdrant_client.delete.assert_called_once()
+        processor.qdrant_client.batch_update_points.assert_not_called()
+        assert str(test_file) not in processor.processed_files
+
+    def test_process_changed_file_truncated_deletes_points(self, processor, tmp_path):
+        """Test that a file truncated below the size threshold has its points removed."""
+        test_file = processor.source_dir / "truncated.md"
+        test_file.write_text("# Test\nContent here.")
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
+
+        assert processor._process_file(test_file) is True
+
+        test_file.write_text("# Hi\n")
+        assert processor._process_file(test_file) is True
+
+        processor.qdrant_client.delete.assert_called_once()
+        assert str(test_file) not in processor.processed_files
+        assert str(test_file) not in processor.file_hashes
+
     def test_process_empty_file(self, processor, tmp_path):
         """Test processing empty files."""
         test_file = processor.source_dir / "empty.md"
@@ -95,6 +173,32 @@ More content after the code block.
         # Should not create embeddings for empty content
         processor.openai_client.embeddings.create.assert_not_called()
 
+    def test_process_near_empty_file_skipped_by_size(self, processor, tmp_path):
+        """Test that tiny files are skipped from their size alone."""
+        test_file = processor.source_dir / "tiny.md"
+        test_file.write_text("# Hi\n")
+
+        with patch.object(Path, 'read_bytes') as mock_read:
+            result = processor._process_file(test_file)
+
+        assert result is True
+        mock_read.assert_not_called()
+        processor.openai_client.embeddings.create.assert_not_called()
+
+    def test_process_large_file_memory_mapped(self, processor, tmp_path):
+        """Test that large files are read through a memory map."""
+        test_file = processor.source_dir / "large.md"
+        test_file.write_text("# Large\n\n" + "Flame components and systems. " * 2000)
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
+
+        with patch.object(Path, 'read_bytes') as mock_read:
+            result = processor._process_file(test_file)
+
+        assert result is True
+        mock_read.assert_not_called()
+        points = processor.qdrant_client.upsert.call_args[1]['points']
+        assert points[0].payload["content"].startswith("# Large")
+
 
 class TestBatchProcessing:
     """Test batch processing of multiple files."""
@@ -109,11 +213,7 @@ class TestBatchProcessing:
             files.append(test_file)
         
         # Mock embedding responses
-        mock_response = Mock()
-        mock_embedding = Mock()
-        mock_embedding.embedding = [0.1] * 1536
-        mock_response.data = [mock_embedding]
-        processor.openai_client.embeddings.create.return_value = mock_response
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
         
         # Process all files
         processor.process_all_files()
@@ -121,8 +221,44 @@ class TestBatchProcessing:
         # All files should be processed
         assert len(processor.processed_files) == 3
         
-        # Should have called embedding API multiple times
-        assert processor.openai_client.embeddings.create.call_count >= 3
+        # Chunks from all files should share a single embedding request
+        assert processor.openai_client.embeddings.create.call_count == 1
+        texts = processor.openai_client.embeddings.create.call_args[1]['input']
+        assert len(texts) == 3
+    
+    def test_process_multiple_files_respects_batch_size(self, processor, tmp_path):
+        """Test that embedding batches are capped at the configured size."""
+        for i in range(3):
+            test_file = processor.source_dir / f"test_{i}.md"
+            test_file.write_text(f"# Document {i}\n\nContent for document {i}.")
+        
+        processor.embedding_batch_size = 2
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
+        
+        processor.process_all_files()
+        
+        assert len(processor.processed_files) == 3
+        assert processor.openai_client.embeddings.create.call_count == 2
+        batch_sizes = sorted(
+            len(call[1]['input'])
+            for call in processor.openai_client.embeddings.create.call_args_list
+        )
+        assert batch_sizes == [1, 2]
+    
+    def test_process_multiple_files_respects_batch_tokens(self, processor, tmp_path):
+        """Test that embedding batches are capped at the token budget."""
+        for i in range(3):
+            test_file = processor.source_dir / f"test_{i}.md"
+            test_file.write_text(f"# Document {i}\n\nContent for document {i}.")
+        
+        processor.embedding_batch_tokens = 1
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
+        
+        processor.process_all_files()
+        
+        # Each file exceeds the budget alone, so each gets its own request
+        assert len(processor.processed_files) == 3
+        assert processor.openai_client.embeddings.create.call_count == 3
     
     def test_process_files_with_mixed_results(self, processor, tmp_path):
         """Test processing files with some successes and some failures."""
@@ -138,11 +274,7 @@ class TestBatchProcessing:
             if "Bad Document" in str(kwargs.get('input', [])):
                 raise Exception("Simulated API Error")
             
-            mock_response = Mock()
-            mock_embedding = Mock()
-            mock_embedding.embedding = [0.1] * 1536
-            mock_response.data = [mock_embedding]
-            return mock_response
+            return _embedding_response(*args, **kwargs)
         
         processor.openai_client.embeddings.create.side_effect = mock_embedding_side_effect
         
@@ -200,11 +332,7 @@ Then import it in your code.
 """)
         
         # Mock all external dependencies
-        mock_response = Mock()
-        mock_embedding = Mock()
-        mock_embedding.embedding = [0.1] * 1536
-        mock_response.data = [mock_embedding]
-        processor.openai_client.embeddings.create.return_value = mock_response
+        processor.openai_client.embeddings.create.side_effect = _embedding_response
         
         # Run the complete pipeline
         processor.process_all_files()
@@ -218,9 +346,13 @@ Then import it in your code.
         assert any("flame" in path for path in processed_paths)
         assert any("tutorials" in path for path in processed_paths)
         
-        # Verify embeddings were created and stored
-        assert processor.openai_client.embeddings.create.call_count >= 2
-        assert processor.qdrant_client.upsert.call_count >= 2
+        # Verify embeddings were created and stored in one batch
+        assert processor.openai_client.embeddings.create.call_count == 1
+        assert processor.qdrant_client.upsert.call_count == 1
+        points = processor.qdrant_client.upsert.call_args[1]['points']
+        assert {p.payload["section"] for p in points} == {"flame", "tutorials"}
+        # Bulk upserts do not block on Qdrant applying the batch
+        assert processor.qdrant_client.upsert.call_args[1]['wait'] is False
     
     def test_resumable_processing(self, processor, tmp_path):
         """Test that processing can be resumed after interruption."""
@@ -245,29 +377,27 @@ Then import it in your code.
         
         # Create new processor instance (simulating restart)
         from process_flame_docs import FlameDocsProcessor
-        from unittest.mock import patch
-        
-        with patch('process_flame_docs.AzureOpenAI'), \
-             patch('process_flame_docs.QdrantClient'):
-            new_processor = FlameDocsProcessor(version="1.7.0")
-            # Set the paths before loading state
-            new_processor.source_dir = processor.source_dir
-            new_processor.state_file = processor.state_file
-            new_processor.error_file = processor.error_file
-            new_processor.openai_client = processor.openai_client
-            new_processor.qdrant_client = processor.qdrant_client
-            
-            # Manually reload state from the correct file
-            new_processor.processed_files = set()
-            new_processor.chunks_created = 0
-            new_processor._load_state()
-            
-            # Should load previous state
-            assert len(new_processor.processed_files) == 1
-            assert new_processor.chunks_created == 5
-            
-            # Process remaining files
-            new_processor.process_all_files()
-            
-            # Should process only the unprocessed file
-            assert len(new_processor.processed_files) == 2 
\ No newline at end of file
+        
+        new_processor = FlameDocsProcessor(
+            version="1.7.0",
+            openai_client=processor.openai_client,
+            qdrant_client=processor.qdrant_client)
+        # Set the paths before loading state
+        new_processor.source_dir = processor.source_dir
+        new_processor.state_file = processor.state_file
+        new_processor.error_file = processor.error_file
+        
+        # Manually reload state from the correct file
+        new_processor.processed_files = set()
+        new_processor.chunks_created = 0
+        new_processor._load_state()
+        
+        # Should load previous state
+        assert len(new_processor.processed_files) == 1
+        assert new_processor.chunks_created == 5
+        
+        # Process remaining files
+        new_processor.process_all_files()
+        
+        # Should process only the unprocessed file
+        assert len(new_processor.processed_files) == 2 
\ No newline at end of file
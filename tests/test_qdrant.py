@@ -2,8 +2,9 @@
 Tests for Qdrant storage functionality
 """
 
+import numpy as np
 import pytest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 from process_flame_docs import DocumentChunk
 
 
@@ -29,6 +30,20 @@ class TestQdrantStorage:
             assert hasattr(point, 'id')
             assert hasattr(point, 'vector')
             assert hasattr(point, 'payload')
+        
+        # Vectors are stored unchanged
+        np.testing.assert_allclose([point.vector for point in points], sample_embeddings)
+    
+    def test_store_in_qdrant_batched(self, processor, sample_chunks, sample_embeddings):
+        """Test that large inputs are split into several upserts."""
+        processor.upsert_batch_size = 1
+        
+        processor._store_in_qdrant(sample_chunks, sample_embeddings)
+        
+        calls = processor.qdrant_client.upsert.call_args_list
+        assert [len(call[1]['points']) for call in calls] == [1, 1]
+        # Only the final upsert waits for Qdrant to apply the points
+        assert [call[1]['wait'] for call in calls] == [False, True]
     
     def test_store_in_qdrant_mismatch(self, processor, sample_chunks):
         """Test error when chunks and embeddings don't match."""
@@ -85,6 +100,22 @@ class TestQdrantStorage:
         assert payload["has_code"] is True
 
 
+class TestQdrantClientConfiguration:
+    """Test Qdrant client construction."""
+    
+    def test_client_prefers_grpc(self, processor):
+        """Test that the pipeline uploads over gRPC with a bulk-friendly timeout."""
+        with patch('process_flame_docs.QdrantClient') as mock_client, \
+             patch.dict('os.environ', {'QDRANT_GRPC_PORT': '6334',
+                                         'QDRANT_PREFER_GRPC': 'true'}):
+            processor._init_qdrant_client()
+        
+        kwargs = mock_client.call_args[1]
+        assert kwargs['prefer_grpc'] is True
+        assert kwargs['grpc_port'] == 6334
+        assert kwargs['timeout'] == 120
+
+
 class TestCollectionManagement:
     """Test Qdrant collection management."""
     
@@ -144,6 +175,54 @@ class TestCollectionManagement:
         assert vectors_config.size == 1536
         # Should use cosine distance
         assert hasattr(vectors_config, 'distance')
+        
+        # Should keep binary quantized vectors in RAM
+        quantization = call_args[1]['quantization_config'].binary
+        assert quantization.always_ram is True
+    
+    def test_indexing_paused_during_processing(self, processor):
+        """Test that HNSW indexing is disabled while files are ingested."""
+        (processor.source_dir / "doc.md").write_text("# Doc\n\nSome content.")
+        processor.qdrant_client.get_collection.return_value.config.optimizer_config.indexing_threshold = 5000
+        processor.qdrant_client.update_collection.reset_mock()
+        
+        processor.process_all_files()
+        
+        thresholds = [
+            call[1]['optimizers_config'].indexing_threshold
+            for call in processor.qdrant_client.update_collection.call_args_list
+        ]
+        # The collection's own threshold is restored
+        assert thresholds == [0, 5000]
+    
+    def test_indexing_untouched_without_uploads(self, processor):
+        """Test that a run with nothing to upload leaves indexing alone."""
+        doc = processor.source_dir / "doc.md"
+        doc.write_text("# Doc\n\nSome content.")
+        processor.processed_files.add(str(doc))
+        processor.qdrant_client.update_collection.reset_mock()
+        
+        processor.process_all_files()
+        
+        processor.qdrant_client.update_collection.assert_not_called()
+    
+    def test_indexing_restored_after_failure(self, processor):
+        """Test that indexing is re-enabled even if processing crashes."""
+        (processor.source_dir / "doc.md").write_text("# Doc\n\nSome content.")
+        processor.qdrant_client.update_collection.reset_mock()
+        
+        async def crash(md_files):
+            processor._pause_indexing()
+            raise RuntimeError("crash")
+        
+        with patch.object(processor, '_process_files_concurrently',
+                          side_effect=crash):
+            with pytest.raises(RuntimeError):
+                processor.process_all_files()
+        
+        # Without a reported threshold, the configured default is restored
+        last_call = processor.qdrant_client.update_collection.call_args
+        assert last_call[1]['optimizers_config'].indexing_threshold == processor.indexing_threshold
     
     def test_collection_name_from_env(self, processor):
         """Test that collection name comes from configuration."""
@@ -0,0 +1,219 @@
+"""
+Tests for the MCP server query embedding path
+"""
+
+import asyncio
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+import server
+
+
+def _embeddings_response(inputs, vector=(0.1, 0.2, 0.3)):
+    """Build an embeddings response with one vector per input."""
+    return Mock(data=[Mock(embedding=list(vector)) for _ in inputs])
+
+
+@pytest.fixture
+def openai_client():
+    """Mock async OpenAI client used by the server."""
+    client = Mock()
+    client.embeddings.create = AsyncMock(
+        side_effect=lambda input, **kwargs: _embeddings_response(input))
+    with patch('server.get_openai_client', return_value=client):
+        yield client
+
+
+async def _embed_all(batcher, queries):
+    """Embed queries concurrently, failing instead of hanging."""
+    return await asyncio.wait_for(
+        asyncio.gather(*(batcher.embed(query) for query in queries),
+                       return_exceptions=True),
+        timeout=5)
+
+
+class TestEmbeddingBatcher:
+    """Test batching of query embedding requests."""
+
+    def test_short_response_fails_every_request(self, openai_client):
+        """Test that a response with too few embeddings fails the whole batch."""
+        openai_client.embeddings.create.side_effect = (
+            lambda input, **kwargs: _embeddings_response(input[:1]))
+        batcher = server._EmbeddingBatcher()
+
+        results = asyncio.run(_embed_all(batcher, ["one", "two", "three"]))
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_api_error_fails_every_request(self, openai_client):
+        """Test that an embeddings API error reaches every waiting caller."""
+        openai_client.embeddings.create.side_effect = RuntimeError("API down")
+        batcher = server._EmbeddingBatcher()
+
+        results = asyncio.run(_embed_all(batcher, ["one", "two"]))
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_batches_are_embedded_concurrently(self, openai_client):
+        """Test that a slow embeddings call does not hold back the next batch."""
+        started = []
+
+        async def create(input, **kwargs):
+            started.append(input)
+            # The first call only returns once the second one has started
+            while len(started) < 2:
+                await asyncio.sleep(0.001)
+            return _embeddings_response(input)
+
+        openai_client.embeddings.create.side_effect = create
+        batcher = server._EmbeddingBatcher(max_batch=1)
+
+        results = asyncio.run(_embed_all(batcher, ["one", "two"]))
+
+        assert started == [["one"], ["two"]]
+        assert all(result.tolist() == pytest.approx([0.1, 0.2, 0.3]) for result in results)
+        timeout = openai_client.embeddings.create.call_args.kwargs["timeout"]
+        assert timeout == server.QUERY_EMBEDDING_TIMEOUT
+
+    def test_bad_embedding_fails_only_its_request(self, openai_client):
+        """Test that a malformed embedding does not stop the rest of the batch."""
+        openai_client.embeddings.create.side_effect = lambda input, **kwargs: Mock(
+            data=[Mock(embedding=["not a number"]), Mock(embedding=[0.5, 0.5])])
+        batcher = server._EmbeddingBatcher()
+
+        async def run():
+            results = await _embed_all(batcher, ["bad", "good"])
+            # The drain task keeps serving later requests
+            openai_client.embeddings.create.side_effect = (
+                lambda input, **kwargs: _embeddings_response(input))
+            return results, await _embed_all(batcher, ["later"])
+
+        results, later = asyncio.run(run())
+
+        assert isinstance(results[0], ValueError)
+        assert results[1].tolist() == [0.5, 0.5]
+        assert later[0].tolist() == pytest.approx([0.1, 0.2, 0.3])
+
+
+class TestGetFlameKnowledge:
+    """Test the get_flame_knowledge tool with mocked clients."""
+
+    @pytest.fixture
+    def qdrant_client(self):
+        """Mock async Qdrant client returning a single hit."""
+        hit = Mock(score=0.8, payload={"content": "Sprites are drawn by SpriteComponent.",
+                                       "title": "Sprites", "version": "1.7.0"})
+        client = Mock()
+        client.query_points = AsyncMock(return_value=Mock(points=[hit]))
+        with patch('server.get_qdrant_client', return_value=client), \
+             patch('server._response_cache', server._ResponseCache(8, 60)), \
+             patch('server._query_embedding_cache', server._QueryEmbeddingCache(8, 0.95)), \
+             patch('server._embedding_batcher', server._EmbeddingBatcher()):
+            yield client
+
+    def test_returns_ranked_results(self, openai_client, qdrant_client):
+        """Test that a query is embedded, searched and formatted."""
+        # fastmcp 2.x wraps tools, the coroutine function is kept as .fn
+        tool = getattr(server.get_flame_knowledge, "fn", server.get_flame_knowledge)
+
+        results = asyncio.run(asyncio.wait_for(
+            tool("render a sprite"), timeout=5))
+
+        assert len(results) == 1
+        assert results[0]["title"] == "Sprites"
+        assert results[0]["version"] == "1.7.0"
+        openai_client.embeddings.create.assert_awaited_once()
+        query = qdrant_client.query_points.call_args.kwargs["query"]
+        assert query.tolist() == pytest.approx([0.1, 0.2, 0.3])
+
+
+class TestGetFlameKnowledgeMany:
+    """Test the get_flame_knowledge_many tool with mocked clients."""
+
+    @pytest.fixture
+    def qdrant_client(self):
+        """Mock async Qdrant client returning one hit per batched request."""
+        hit = Mock(score=0.8, payload={"content": "Sprites are drawn by SpriteComponent.",
+                                       "title": "Sprites"})
+        client = Mock()
+        client.query_batch_points = AsyncMock(
+            side_effect=lambda collection_name, requests: [Mock(points=[hit]) for _ in requests])
+        with patch('server.get_qdrant_client', return_value=client), \
+             patch('server._response_cache', server._ResponseCache(8, 60)), \
+             patch('server._query_embedding_cache', server._QueryEmbeddingCache(8, 1.0)), \
+             patch('server._embedding_batcher', server._EmbeddingBatcher()):
+            yield client
+
+    def test_duplicate_queries_searched_once(self, openai_client, qdrant_client):
+        """Test that queries normalizing to the same key are embedded and searched once."""
+        tool = getattr(server.get_flame_knowledge_many, "fn", server.get_flame_knowledge_many)
+
+        results = asyncio.run(asyncio.wait_for(
+            tool(["Render a sprite", "render  a SPRITE", "load audio"]), timeout=5))
+
+        assert len(results) == 3
+        assert results[0] == results[1]
+        assert results[0] is not results[1]
+        embedded = [query for call in openai_client.embeddings.create.call_args_list
+                    for query in call.kwargs["input"]]
+        assert embedded == ["Render a sprite", "load audio"]
+        assert len(qdrant_client.query_batch_points.call_args.kwargs["requests"]) == 2
+
+
+class TestBoostPatterns:
+    """Test the term patterns used to boost search results."""
+
+    @pytest.mark.parametrize("query", [
+        "add buttons to the menu", "pause menus", "game screens",
+        "overlays", "custom widgets", "UI layout",
+    ])
+    def test_ui_query_matches_singular_and_plural(self, query):
+        """Test that UI terms are recognized in singular and plural form."""
+        assert server._UI_QUERY_RE.search(query) is not None
+
+    def test_ui_query_ignores_partial_words(self):
+        """Test that UI terms inside other words do not count."""
+        assert server._UI_QUERY_RE.search("build a guide for the quick sprite") is None
+
+    def test_ui_content_ignores_partial_words(self):
+        """Test that content only counts as UI for whole words."""
+        assert server._UI_CONTENT_RE.search("Build the guide step by step.") is None
+        assert server._UI_CONTENT_RE.search("Overlays are drawn above the game.") is not None
+
+
+class TestQueryEmbeddingCache:
+    """Test reuse of cached query embeddings."""
+
+    def _cache(self, similarity, *queries):
+        """Build a cache holding an embedding for each query."""
+        cache = server._QueryEmbeddingCache(8, similarity)
+        for i, query in enumerate(queries):
+            cache.put(query, np.full(3, i, dtype=np.float32))
+        return cache
+
+    def test_exact_match_only_by_default(self):
+        """Test that near matches are off unless a similarity below 1.0 is set."""
+        cache = self._cache(server.QUERY_CACHE_SIMILARITY, "how to add a sprite component")
+
+        assert cache.get("how to add a sprite component") is not None
+        assert cache.get("how to add a sprite componnet") is None
+
+    def test_near_match_when_enabled(self):
+        """Test that a typo variant reuses the cached embedding when enabled."""
+        cache = self._cache(0.95, "how to add a sprite component")
+
+        assert cache.get("how to add a sprite componnet") is not None
+
+    def test_near_match_requires_same_numbers(self):
+        """Test that queries differing only in a version number are not merged."""
+        cache = self._cache(0.95, "what changed in flame 1.29.0 for sprite components")
+
+        assert cache.get("what changed in flame 1.28.0 for sprite components") is None
+
+    def test_near_match_requires_same_negations(self):
+        """Test that a negated query does not reuse the plain query's embedding."""
+        cache = self._cache(0.9, "how to render sprites with collision detection")
+
+        assert cache.get("how to render sprites without collision detection") is None
+        assert cache.get("how to render sprites not with collision detection") is None
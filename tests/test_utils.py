@@ -4,8 +4,10 @@ Tests for utility functions and state management
 
 import pytest
 import json
+import sqlite3
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import Mock, patch
+from process_flame_docs import FlameDocsProcessor
 
 
 class TestTokenCounting:
@@ -64,7 +66,7 @@ class TestStateManagement:
     def test_save_and_load_state(self, processor, tmp_path):
         """Test state persistence."""
         # Use temporary files for testing
-        processor.state_file = tmp_path / "test_state.json"
+        processor.state_file = tmp_path / "test_state.db"
         
         # Set some state
         processor.processed_files.add("file1.md")
@@ -78,12 +80,11 @@ class TestStateManagement:
         assert processor.state_file.exists()
         
         # Create new processor instance and load state
-        with patch('process_flame_docs.AzureOpenAI'), \
-             patch('process_flame_docs.QdrantClient'):
-            from process_flame_docs import FlameDocsProcessor
-            new_processor = FlameDocsProcessor(version="1.7.0")
-            new_processor.state_file = processor.state_file
-            new_processor._load_state()
+        new_processor = FlameDocsProcessor(version="1.7.0",
+                                           openai_client=Mock(),
+                                           qdrant_client=Mock())
+        new_processor.state_file = processor.state_file
+        new_processor._load_state()
         
         # State should be restored
         assert len(new_processor.processed_files) == 2
@@ -91,22 +92,135 @@ class TestStateManagement:
         assert "file2.md" in new_processor.processed_files
         assert new_processor.chunks_created == 42
     
-    def test_save_state_creates_valid_json(self, processor, tmp_path):
-        """Test that saved state is valid JSON."""
-        processor.state_file = tmp_path / "test_state.json"
+    def test_load_state_migrates_json_state(self, processor, tmp_path):
+        """Test that a JSON state file from older releases is imported once."""
+        processor.state_file = tmp_path / "test_state.db"
+        legacy_file = tmp_path / "test_state.json"
+        legacy_file.write_text(json.dumps({
+            "processed_files": ["file1.md", "file2.md"],
+            "chunks_created": 7,
+        }))
+        
+        processor._load_state()
+        
+        assert processor.processed_files == {"file1.md", "file2.md"}
+        assert processor.chunks_created == 7
+        # Legacy entries have no hash, so they are skipped rather than re-ingested
+        assert processor.file_hashes == {}
+        assert not legacy_file.exists()
+        assert (tmp_path / "test_state.json.migrated").exists()
+        
+        processor._close_state_db()
+        new_processor = FlameDocsProcessor(version="1.7.0",
+                                           openai_client=Mock(),
+                                           qdrant_client=Mock())
+        new_processor.state_file = processor.state_file
+        new_processor._load_state()
+        
+        assert new_processor.processed_files == {"file1.md", "file2.md"}
+    
+    def test_load_state_after_many_incremental_records(self, processor, sample_chunks):
+        """Test that files recorded one at a time are all restored."""
+        for i in range(1000):
+            for chunk in sample_chunks:
+                chunk.metadata["content_hash"] = f"hash{i}"
+            processor._mark_processed(Path(f"doc{i}.md"), sample_chunks)
+        processor._close_state_db()
+        
+        new_processor = FlameDocsProcessor(version="1.7.0",
+                                           openai_client=Mock(),
+                                           qdrant_client=Mock())
+        new_processor.state_file = processor.state_file
+        new_processor._load_state()
+        
+        assert new_processor.processed_files == {f"doc{i}.md" for i in range(1000)}
+        assert new_processor.file_hashes["doc999.md"] == "hash999"
+    
+    def test_save_state_creates_sqlite_db(self, processor, tmp_path):
+        """Test that saved state is a readable SQLite database."""
+        processor.state_file = tmp_path / "test_state.db"
         processor.processed_files.add("test.md")
         processor.chunks_created = 10
         
+        processor._save_state()
+        processor._close_state_db()
+        
+        conn = sqlite3.connect(processor.state_file)
+        paths = [row[0] for row in conn.execute("SELECT path FROM processed")]
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        conn.close()
+        
+        assert paths == ["test.md"]
+        assert meta["chunks_created"] == "10"
+        assert "last_updated" in meta
+    
+    def test_save_state_skips_when_clean(self, processor, sample_chunks):
+        """Test that saving again without changes writes nothing."""
+        for chunk in sample_chunks:
+            chunk.metadata["content_hash"] = "abc123"
+        processor.processed_files.add("test.md")
+        processor.chunks_created = 3
+        processor._save_state()
+        
+        with patch.object(processor, '_connect_state_db') as mock_connect:
+            processor._save_state()
+            mock_connect.assert_not_called()
+        
+        processor._mark_processed(Path("doc.md"), sample_chunks)
+        with patch.object(processor, '_connect_state_db') as mock_connect:
+            processor._save_state()
+            mock_connect.assert_called_once()
+    
+    def test_save_state_after_swapping_files(self, processor, sample_chunks, tmp_path):
+        """Test that removing one file and adding another still saves state."""
+        processor.source_dir = tmp_path
+        for chunk in sample_chunks:
+            chunk.metadata["content_hash"] = "abc123"
+        processor._mark_processed(tmp_path / "old.md", sample_chunks)
+        processor._save_state()
+        
+        processor._delete_file_points(tmp_path / "old.md")
+        processor._mark_processed(tmp_path / "new.md", sample_chunks)
+        
+        with patch.object(processor, '_connect_state_db') as mock_connect:
+            processor._save_state()
+            mock_connect.assert_called_once()
+    
+    def test_processed_file_persisted_immediately(self, processor, sample_chunks):
+        """Test that each processed file is written without a full save."""
+        for chunk in sample_chunks:
+            chunk.metadata["content_hash"] = "abc123"
+        
+        processor._mark_processed(Path("doc.md"), sample_chunks)
+        
+        conn = sqlite3.connect(processor.state_file)
+        rows = conn.execute(
+            "SELECT path, content_hash, chunks FROM processed").fetchall()
+        conn.close()
+        
+        assert rows == [("doc.md", "abc123", 2)]
+    
+    def test_close_state_db_checkpoints_wal(self, processor, sample_chunks):
+        """Test that closing the database folds the WAL into the main file."""
+        for chunk in sample_chunks:
+            chunk.metadata["content_hash"] = "abc123"
+        processor._mark_processed(Path("doc.md"), sample_chunks)
+        
+        processor._close_state_db()
+        
+        wal_file = Path(f"{processor.state_file}-wal")
+        assert not wal_file.exists() or wal_file.stat().st_size == 0
+    
+    def test_reset_state(self, processor):
+        """Test that resetting removes the database and in-memory state."""
+        processor.processed_files.add("file1.md")
         processor._save_state()
         
-        # Should be able to load as JSON
-        with open(processor.state_file, 'r') as f:
-            state = json.load(f)
+        processor._reset_state()
         
-        assert "processed_files" in state
-        assert "chunks_created" in state
-        assert "last_updated" in state
-        assert state["chunks_created"] == 10
+        assert not processor.state_file.exists()
+        assert len(processor.processed_files) == 0
+        assert processor.chunks_created == 0
     
     def test_load_state_missing_file(self, processor, tmp_path):
         """Test loading state when file doesn't exist."""
@@ -168,6 +282,21 @@ class TestErrorHandling:
         assert errors[0]["file"] == "test1.md"
         assert errors[1]["file"] == "test2.md"
     
+    def test_save_errors_atomic_no_partial(self, processor, tmp_path):
+        """Test that a failed write keeps the previous report intact."""
+        processor.error_file = tmp_path / "test_errors.json"
+        processor.errors = [{"file": "old.md", "error": "Old error"}]
+        processor._save_errors()
+        
+        processor.errors.append({"file": "new.md", "error": "New error"})
+        with patch('process_flame_docs.os.replace', side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                processor._save_errors()
+        
+        with open(processor.error_file, 'r') as f:
+            assert json.load(f) == [{"file": "old.md", "error": "Old error"}]
+        assert list(tmp_path.glob("*.tmp")) == []
+    
     def test_save_errors_empty_list(self, processor, tmp_path):
         """Test saving empty error list."""
         processor.error_file = tmp_path / "empty_errors.json"